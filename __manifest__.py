@@ -1,6 +1,6 @@
 {
     'name': 'Dental Clinic Management System',
-    'version': '1.0',
+    'version': '1.1',
     'sequence': -101,
     'category': 'Industries/Healthcare',
     'summary': 'Management',
@@ -13,13 +13,16 @@
         # 'security/security.xml',
         'security/ir.model.access.csv',
         'data/data.xml',
+        'data/ir_cron.xml',
         # 'wizard/remove_invoice_views.xml',
         'views/appointment_view.xml',
         'views/patient_view.xml',
+        'views/clinic_kpi_views.xml',
         # 'views/backend.xml',
         'views/Patient_Appointment_Form_view_customization.xml',
         'views/inventory_stock.xml',
         'report/report_sale_receipt_template.xml',
+        'report/clinic_utilization_report.xml',
         # 'report/report.xml',
     ],
     'qweb': [
@@ -1,2 +1,2 @@
 # from ..models import access_token
-from . import login, common
\ No newline at end of file
+from . import login, common, main
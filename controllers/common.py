@@ -1,10 +1,28 @@
 import ast
+import base64
 import datetime
+import functools
+import gzip
+import hashlib
 import json
 import logging
+import math
+import zlib
 
 import werkzeug.wrappers
 
+from odoo.http import request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 _logger = logging.getLogger(__name__)
 
 
@@ -15,13 +33,175 @@ def default(o):
         return str(o)
 
 
-def valid_response(data, status=200):
+def _stdlib_dumps(data):
+    return json.dumps(data, default=default).encode()
+
+
+def _orjson_dumps(data):
+    # orjson writes dates, datetimes (isoformat, like default()) and tuples such
+    # as many2one (id, display_name) pairs natively; default() only sees bytes.
+    return orjson.dumps(data, default=default, option=orjson.OPT_NON_STR_KEYS)
+
+
+SERIALIZERS = {"json": _stdlib_dumps}
+if orjson is not None:
+    SERIALIZERS["orjson"] = _orjson_dumps
+_serializer = SERIALIZERS.get("orjson", _stdlib_dumps)
+
+
+def use_serializer(name):
+    """Select the JSON encoder of the response helpers, one of SERIALIZERS."""
+    global _serializer
+    _serializer = SERIALIZERS[name]
+
+
+def dumps(data):
+    """Serialize ``data`` to JSON bytes with the selected encoder: orjson when it
+    is installed, the standard library otherwise."""
+    return _serializer(data)
+
+
+# Bodies smaller than this go out uncompressed: not worth the CPU and headers.
+COMPRESSION_MIN_SIZE = 1024
+# Streamed bodies are flushed to the client every that many input bytes.
+COMPRESSION_FLUSH_SIZE = 64 * 1024
+
+
+def negotiate_encoding():
+    """Best content coding supported by both the client and this server."""
+    available = (["br"] if brotli is not None else []) + ["gzip"]
+    try:
+        return request.httprequest.accept_encodings.best_match(available)
+    except RuntimeError:  # outside of a request
+        return None
+
+
+def _log_compression(encoding, raw_size, compressed_size):
+    _logger.info(
+        "%s %s: %s bytes compressed to %s with %s (ratio %.2f)",
+        request.httprequest.method, request.httprequest.path, raw_size, compressed_size, encoding,
+        raw_size / compressed_size if compressed_size else 0,
+    )
+
+
+def compress_response(response):
+    """Compress the (already built, not streamed) body of ``response`` with the
+    coding negotiated through Accept-Encoding, if it is large enough."""
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    encoding = negotiate_encoding()
+    if not encoding or len(body) < COMPRESSION_MIN_SIZE:
+        return response
+    compressed = brotli.compress(body) if encoding == "br" else gzip.compress(body, compresslevel=6)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    _log_compression(encoding, len(body), len(compressed))
+    return response
+
+
+def compress_stream(chunks, encoding):
+    """Compress the ``chunks`` of a streamed body on the fly, flushing every
+    COMPRESSION_FLUSH_SIZE input bytes so the client keeps receiving data."""
+    if encoding == "br":
+        compressor = brotli.Compressor()
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+        process, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    raw_size = compressed_size = pending = 0
+    try:
+        for chunk in chunks:
+            raw_size += len(chunk)
+            pending += len(chunk)
+            data = process(chunk)
+            if pending >= COMPRESSION_FLUSH_SIZE:
+                data += flush()
+                pending = 0
+            if data:
+                compressed_size += len(data)
+                yield data
+        data = finish()
+        compressed_size += len(data)
+        yield data
+    finally:
+        _log_compression(encoding, raw_size, compressed_size)
+
+
+# Responses hold patient data: never store them in shared caches, and have
+# clients revalidate their private copy with If-None-Match every time.
+PRIVATE_CACHE_HEADERS = [("Cache-Control", "private, no-cache"), ("Vary", "access_token")]
+
+
+def valid_response(data, status=200, etag=None):
     """Valid Response
     This will be return when the http request was successfully processed."""
     data = {"count": len(data) if not isinstance(data, str) else 1, "data": data}
-    return werkzeug.wrappers.Response(
-        status=status, content_type="application/json; charset=utf-8", response=json.dumps(data, default=default),
+    response = werkzeug.wrappers.Response(
+        status=status, content_type="application/json; charset=utf-8", response=dumps(data),
+    )
+    compress_response(response)
+    if etag:
+        set_private_etag(response, etag)
+    return response
+
+
+def compute_etag(*parts):
+    """Weak validator for a response built from ``parts``, typically the user,
+    the request path and parameters and the (count, max write_date) of the
+    records it is made of."""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def set_private_etag(response, etag):
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("access_token")
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def etag_matches(etag):
+    return request.httprequest.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag):
+    return set_private_etag(werkzeug.wrappers.Response(status=304), etag)
+
+
+def conditional_json(etag):
+    """ETag handling for ``type="json"`` routes, whose status cannot be set:
+    adds the validator and cache headers to the response and tells whether the
+    client copy is current, in which case the route should answer with a
+    ``not_modified`` body instead of its data."""
+    headers = request.future_response.headers
+    for name, value in PRIVATE_CACHE_HEADERS:
+        headers[name] = value
+    headers["ETag"] = 'W/"%s"' % etag
+    return etag_matches(etag)
+
+
+def ndjson_response(rows, status=200):
+    """Streamed response writing one JSON document per line for each row of
+    the ``rows`` iterable. Errors raised while iterating are logged and
+    reported as a last ``{"error": ...}`` line, the status being already sent."""
+    def generate():
+        try:
+            for row in rows:
+                yield dumps(row) + b"\n"
+        except Exception as e:
+            _logger.exception("NDJSON stream aborted")
+            yield dumps({"error": str(e)}) + b"\n"
+
+    body = generate()
+    encoding = negotiate_encoding()
+    if encoding:
+        body = compress_stream(body, encoding)
+    response = werkzeug.wrappers.Response(
+        body, status=status, content_type="application/x-ndjson; charset=utf-8", direct_passthrough=True,
     )
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
 
 
 def invalid_response(typ, message=None, status=401):
@@ -29,14 +209,46 @@ def invalid_response(typ, message=None, status=401):
     This will be the return value whenever the server runs into an error
     either from the client or the server."""
     # return json.dumps({})
-    return werkzeug.wrappers.Response(
+    response = werkzeug.wrappers.Response(
         status=status,
         content_type="application/json; charset=utf-8",
-        response=json.dumps(
+        response=dumps(
             {"type": typ, "message": str(message) if str(message) else "wrong arguments (missing validation)",},
-            default=datetime.datetime.isoformat,
         ),
     )
+    if request.dispatcher.routing_type == "json":
+        # Turned into a string inside the JSON-RPC result: compressing it would
+        # be wasted, ir.http compresses the whole envelope instead.
+        return response
+    return compress_response(response)
+
+
+def rate_limit_class(name):
+    """Put the decorated endpoint in the ``name`` rate limit class instead of
+    the "read" (GET) or "write" one; see models/rate_limit.py."""
+    def decorator(func):
+        func._rate_limit_class = name
+        return func
+    return decorator
+
+
+def rate_limited_response(access_token, func):
+    """What to answer when ``access_token`` has used up its budget for the
+    class of endpoint ``func``, None when the request may go on: a 429 response
+    on http routes; on ``type="json"`` routes, whose status cannot be set, a
+    ``rate_limited`` body, the Retry-After header going to the future response."""
+    endpoint_class = getattr(func, "_rate_limit_class", None) or (
+        "read" if request.httprequest.method in ("GET", "HEAD") else "write")
+    retry_after = request.env["api.rate.limit.bucket"].sudo()._consume(access_token, endpoint_class)
+    if not retry_after:
+        return None
+    retry_after = math.ceil(retry_after)
+    if request.dispatcher.routing_type == "json":
+        request.future_response.headers["Retry-After"] = str(retry_after)
+        return {"success": False, "error": "rate_limited", "retry_after": retry_after}
+    response = invalid_response("rate_limited", "too many requests, retry later", 429)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
 
 
 def extract_arguments(limit="80", offset=0, order="id", domain="", fields=[]):
@@ -53,3 +265,114 @@ def extract_arguments(limit="80", offset=0, order="id", domain="", fields=[]):
     if offset:
         offset = int(offset)
     return [expresions, fields, offset, limit, order]
+
+
+def parse_bool(value):
+    """Interpret a flag sent as JSON boolean, number or string."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def encode_cursor(values):
+    """Opaque pagination cursor for a tuple of sort key values."""
+    payload = json.dumps(list(values), default=default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def parse_fields(requested, allowed, default):
+    """Validate a ``fields`` parameter (list or comma separated string) against
+    ``allowed``; returns ``default`` when nothing was requested and raises
+    ValueError naming the fields that are not allowed."""
+    if not requested:
+        return list(default)
+    if isinstance(requested, str):
+        requested = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError("fields not allowed: %s" % ", ".join(unknown))
+    return list(dict.fromkeys(requested))
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def _response_payload(response):
+    """Status, content type and uncompressed body text of a built response."""
+    body = response.get_data()
+    encoding = response.headers.get("Content-Encoding")
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    elif encoding == "br":
+        body = brotli.decompress(body)
+    return response.status_code, response.content_type, body.decode()
+
+
+def idempotent(func):
+    """Make a create endpoint safe to retry: the response to a request sent with
+    an Idempotency-Key header is stored with the key, and a retry with the same
+    key and parameters gets it back without running the endpoint again.
+    Error responses are not stored, the request can then be retried."""
+    @functools.wraps(func)
+    def wrap(self, *args, **kwargs):
+        key = request.httprequest.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return func(self, *args, **kwargs)
+        if len(key) > 255:
+            return invalid_response("invalid_idempotency_key", "Idempotency-Key is longer than 255 characters", 400)
+
+        user_id = request.env.uid or request.session.uid
+        endpoint = request.httprequest.path
+        signature = [endpoint, args, kwargs]
+        if request.dispatcher.routing_type == "http":
+            signature.append(request.httprequest.get_data(as_text=True))
+        request_hash = hashlib.sha256(json.dumps(signature, sort_keys=True, default=str).encode()).hexdigest()
+        Keys = request.env["api.idempotency.key"].sudo()
+
+        stored = Keys._claim(user_id, key, endpoint, request_hash)
+        if stored is not None:
+            if stored["request_hash"] != request_hash:
+                return invalid_response(
+                    "idempotency_key_reused", "Idempotency-Key was already used for a different request", 422)
+            if stored["body"] is None:
+                return invalid_response(
+                    "idempotency_key_in_progress", "A request with this Idempotency-Key is still running", 409)
+            if stored["content_type"] is None:
+                request.future_response.headers["Idempotent-Replayed"] = "true"
+                return json.loads(stored["body"])
+            response = werkzeug.wrappers.Response(
+                stored["body"], status=stored["status"], content_type=stored["content_type"])
+            response.headers["Idempotent-Replayed"] = "true"
+            return compress_response(response)
+
+        # In a savepoint: an endpoint answering an error after catching a database
+        # error leaves the transaction aborted, and the claim could not be
+        # released. Rolling back to the savepoint drops the failed work only.
+        with request.env.cr.savepoint() as savepoint:
+            result = func(self, *args, **kwargs)
+            failed = isinstance(result, werkzeug.wrappers.Response) and result.status_code >= 400
+            if failed:
+                savepoint.rollback()
+        if isinstance(result, werkzeug.wrappers.Response):
+            if failed or result.is_streamed:
+                Keys._release(user_id, key)
+            else:
+                Keys._store(user_id, key, *_response_payload(result))
+        else:
+            # type="json" route: store the result, Odoo builds the response.
+            Keys._store(user_id, key, 200, None, json.dumps(result, default=default))
+        return result
+
+    return wrap
@@ -3,7 +3,7 @@ import datetime
 import logging
 import functools
 import werkzeug.wrappers
-from .common import valid_response, invalid_response
+from .common import valid_response, invalid_response, idempotent, rate_limited_response
 from odoo import http
 # from models import 
 # from odoo.models.
@@ -18,14 +18,17 @@ def validate_token(func):
         access_token = request.httprequest.headers.get("access_token")
         if not access_token:
             return invalid_response("access_token_not_found", "missing access token in request header", 401)
-        access_token_data = request.env["api.access_token"].sudo().search([("token", "=", access_token)],
-                                                                          order="id DESC", limit=1)
+        token_info = request.env["api.access_token"].sudo()._get_token_info(access_token)
 
-        if access_token_data.find_or_create_token(user_id=access_token_data.user_id.id) != access_token:
+        if not token_info:
             return invalid_response("access_token", "token seems to have expired or invalid", 401)
 
-        request.session.uid = access_token_data.user_id.id
-        request.uid = access_token_data.user_id.id
+        limited = rate_limited_response(access_token, func)
+        if limited:
+            return limited
+
+        request.session.uid = token_info.user_id
+        request.uid = token_info.user_id
         return func(self, *args, **kwargs)
 
     return wrap
@@ -193,6 +196,7 @@ class AcessToken(http.Controller):
 
     @validate_token
     @http.route("/api/clinic_appointment/create", methods=["POST"], type="http", auth="none", csrf=False)
+    @idempotent
     def create_appointment(self, **post):
         user_id = request.uid
         user_obj = request.env['res.users'].browse(user_id)
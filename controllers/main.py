@@ -5,13 +5,233 @@ import datetime
 import logging
 import functools
 import werkzeug.wrappers
-from .common import valid_response, invalid_response
-from odoo import http
+from .common import (
+    valid_response, invalid_response, ndjson_response, parse_bool, parse_fields, encode_cursor,
+    decode_cursor, compute_etag, conditional_json, etag_matches, not_modified_response, set_private_etag,
+    idempotent, rate_limit_class, rate_limited_response,
+)
+from odoo import api, http
+from odoo.fields import Date, Datetime
+from ..models.bulk_operation import BULK_CONTEXT
+from ..models.clinic_analytics import DEFAULT_MIN_SLOT
+from ..models.appointment_dental_procedure_line import TOOTH_COUNT
+from ..models.delta_sync import SYNC_MODELS
 from odoo.exceptions import AccessDenied, AccessError, UserError
 from odoo.http import request
 
 _logger = logging.getLogger(__name__)
 
+STREAM_BATCH_SIZE = 500
+TIMELINE_MODELS = (
+    "patient.patient", "patient.appointment", "appointment.dental.procedure.line",
+    "patient.prescription", "patient.prescription.line",
+)
+BULK_MAX_ROWS = 1000
+
+PATIENT_WRITABLE_FIELDS = (
+    "patient_name", "contact_number", "date_of_birth", "gender", "occupation", "marital_status", "blood_type",
+)
+
+BATCH_MAX_OPERATIONS = 100
+# Resources reachable through /api/batch: model and fields an operation may set.
+BATCH_RESOURCES = {
+    "patients": ("patient.patient", PATIENT_WRITABLE_FIELDS),
+    "appointments": ("patient.appointment", (
+        "patient_id", "start", "stop", "duration", "allday", "doctor_id", "name", "contact_number",
+        "appointment_type", "chief_complaints",
+    )),
+    "procedure_lines": ("appointment.dental.procedure.line", ("appointment_id", "tooth_no", "service_item_id")),
+    "prescriptions": ("patient.prescription", ("appointment_id", "prescription_date", "notes")),
+    "prescription_lines": ("patient.prescription.line", (
+        "prescription_id", "medicine_trade_name", "therapeutic_regimen",
+    )),
+}
+
+# Fields clients may ask for through the ``fields`` parameter of the GET
+# endpoints, and the projection returned when they do not ask.
+API_FIELDS = {
+    "patient.patient": {
+        "allowed": (
+            "id", "patient_serial", "patient_name", "contact_number", "date_of_birth", "age",
+            "gender", "occupation", "marital_status", "blood_type", "qstn_1", "qstn_1_note",
+            "qstn_2", "qstn_2_note", "appointment_id", "patient_prescriptions", "tooth_mask",
+            "create_date", "write_date",
+        ),
+        "default": ("id", "patient_serial", "patient_name", "contact_number", "date_of_birth", "age", "gender"),
+    },
+    "patient.appointment": {
+        "allowed": (
+            "id", "appointment_serial", "name", "patient_id", "contact_number", "doctor_id", "user_id",
+            "appointment_status", "appointment_type", "start", "stop", "duration", "allday",
+            "chief_complaints", "procedure_line_id", "patient_appointment_prescription_id", "tooth_mask",
+            "create_date", "write_date",
+        ),
+        "default": (
+            "id", "appointment_serial", "patient_id", "doctor_id", "appointment_status",
+            "appointment_type", "start", "stop", "duration",
+        ),
+    },
+    "appointment.dental.procedure.line": {
+        "allowed": ("id", "appointment_id", "tooth_no", "service_item_id", "cost", "create_date", "write_date"),
+        "default": ("id", "appointment_id", "tooth_no", "service_item_id", "cost"),
+    },
+    "patient.prescription": {
+        "allowed": (
+            "id", "prescription_serial", "prescription_date", "appointment_id", "patient_id", "notes",
+            "prescription_line_id", "create_date", "write_date",
+        ),
+        "default": ("id", "prescription_serial", "prescription_date", "appointment_id", "patient_id", "notes"),
+    },
+    "patient.prescription.line": {
+        "allowed": ("id", "prescription_id", "medicine_trade_name", "therapeutic_regimen", "create_date", "write_date"),
+        "default": ("id", "prescription_id", "medicine_trade_name", "therapeutic_regimen"),
+    },
+}
+
+
+def api_fields(model_name, requested):
+    spec = API_FIELDS[model_name]
+    return parse_fields(requested, spec["allowed"], spec["default"])
+
+
+def appointment_domain(kw):
+    """Search domain for the appointment filters shared by the read endpoints."""
+    domain = []
+    if kw.get("date_from"):
+        domain.append(("start", ">=", kw.get("date_from")))
+    if kw.get("date_to"):
+        domain.append(("start", "<=", kw.get("date_to")))
+    if kw.get("patient_id"):
+        domain.append(("patient_id", "=", int(kw.get("patient_id"))))
+    if kw.get("teeth"):
+        domain.append(("treated_tooth", "in", parse_teeth(kw.get("teeth"))))
+    return domain
+
+
+def parse_teeth(teeth):
+    """Tooth numbers given as a list or a comma separated string; raises
+    ValueError on anything but numbers from 1 to TOOTH_COUNT."""
+    if isinstance(teeth, str):
+        teeth = teeth.split(",")
+    if not isinstance(teeth, (list, tuple)):
+        teeth = [teeth]
+    teeth = [int(tooth) for tooth in teeth]
+    if not all(1 <= tooth <= TOOTH_COUNT for tooth in teeth):
+        raise ValueError("tooth numbers must be between 1 and %s" % TOOTH_COUNT)
+    return teeth
+
+
+def result_etag(records, kw, *extra):
+    """Validator of a response made of ``records``, the page actually returned:
+    a record entering, leaving or being written in the page changes its ids or
+    write_dates. Costs no more than the page. Changes of related records (e.g.
+    a renamed patient shown on an appointment) are not seen."""
+    params = json.dumps(kw, sort_keys=True, default=str)
+    write_dates = [str(write_date) for write_date in records.mapped("write_date")]
+    return compute_etag(request.env.uid, request.httprequest.path, params, records.ids, write_dates, *extra)
+
+
+def domain_etag(model_name, domain, kw):
+    """Validator of a response listing all the ``model_name`` records matching
+    ``domain``, from their count and latest write_date: one aggregate over the
+    domain, only worth it for responses that read the whole of it anyway."""
+    count, last_write = request.env[model_name]._read_group(domain, aggregates=["__count", "write_date:max"])[0]
+    params = json.dumps(kw, sort_keys=True, default=str)
+    return compute_etag(request.env.uid, request.httprequest.path, params, count, last_write)
+
+
+NOT_MODIFIED = {"success": True, "not_modified": True}
+
+
+class BatchError(Exception):
+    """An operation of /api/batch is invalid."""
+
+
+def resolve_refs(value, refs):
+    """Replace ``{"$ref": "<ref>"}`` placeholders by the id created by the
+    operation named ``<ref>`` earlier in the batch."""
+    if isinstance(value, dict):
+        if set(value) == {"$ref"}:
+            if value["$ref"] not in refs:
+                raise BatchError("unresolved reference %r" % value["$ref"])
+            return refs[value["$ref"]]
+        return {key: resolve_refs(item, refs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_refs(item, refs) for item in value]
+    return value
+
+
+def run_batch_operation(operation, refs):
+    """Apply one /api/batch operation and return the id of its record."""
+    if not isinstance(operation, dict):
+        raise BatchError("operation must be an object")
+    method = operation.get("op")
+    if operation.get("resource") not in BATCH_RESOURCES:
+        raise BatchError("unknown resource %r" % operation.get("resource"))
+    model_name, writable_fields = BATCH_RESOURCES[operation["resource"]]
+    Model = request.env[model_name]
+    values = resolve_refs(operation.get("values") or {}, refs)
+    unknown = [field for field in values if field not in writable_fields]
+    if unknown:
+        raise BatchError("fields not allowed: %s" % ", ".join(unknown))
+
+    if method == "create":
+        return Model.create(values).id
+    if method not in ("update", "delete"):
+        raise BatchError("unknown op %r" % method)
+    record = Model.browse(int(resolve_refs(operation.get("record_id"), refs) or 0)).exists()
+    if not record:
+        raise BatchError("record not found")
+    if method == "update":
+        record.write(values)
+    else:
+        record.unlink()
+    return record.id
+
+
+def slot_query(kw):
+    """Parse the ``from``, ``to`` and ``duration`` (minutes) slot search parameters."""
+    date_from = Datetime.to_datetime(kw.get("from"))
+    date_to = Datetime.to_datetime(kw.get("to"))
+    if not date_from or not date_to:
+        raise ValueError("'from' and 'to' are required")
+    duration = int(kw.get("duration", 30))
+    if duration <= 0:
+        raise ValueError("'duration' must be a positive number of minutes")
+    return date_from, date_to, datetime.timedelta(minutes=duration)
+
+
+def format_slots(slots):
+    return [{"start": Datetime.to_string(start), "stop": Datetime.to_string(stop)} for start, stop in slots]
+
+
+def iter_batched_read(model_name, domain, fields, batch_size=STREAM_BATCH_SIZE):
+    """Yield the rows of ``model_name`` matching ``domain`` in id order.
+
+    The response body is consumed after the request cursor is closed, so rows
+    are read through a cursor of their own, ``batch_size`` ids at a time, and
+    the record cache is dropped after each batch to keep memory flat.
+    """
+    registry = request.env.registry
+    uid = request.env.uid
+    context = dict(request.env.context)
+
+    def generate():
+        with registry.cursor() as cr:
+            env = api.Environment(cr, uid, context)
+            Model = env[model_name]
+            last_id = 0
+            while True:
+                records = Model.search(domain + [("id", ">", last_id)], order="id", limit=batch_size)
+                if not records:
+                    break
+                yield from records.read(fields)
+                last_id = records[-1].id
+                env.invalidate_all()
+
+    return generate()
+
+
 def validate_token(func):
     """Decorator to validate API access token"""
     @functools.wraps(func)
@@ -20,14 +240,16 @@ def validate_token(func):
         if not access_token:
             return invalid_response("access_token_not_found", "missing access token in request header", 401)
         
-        access_token_data = request.env["api.access_token"].sudo().search(
-            [("token", "=", access_token)], order="id DESC", limit=1
-        )
+        token_info = request.env["api.access_token"].sudo()._get_token_info(access_token)
         
-        if not access_token_data or not access_token_data.is_valid():
+        if not token_info:
             return invalid_response("access_token", "token seems to have expired or invalid", 401)
         
-        request.update_env(user=access_token_data.user_id)
+        limited = rate_limited_response(access_token, func)
+        if limited:
+            return limited
+        
+        request.update_env(user=token_info.user_id)
         return func(self, *args, **kwargs)
     
     return wrap
@@ -88,9 +310,7 @@ class DentalClinicController(http.Controller):
         """Logout and invalidate token"""
         try:
             access_token = request.httprequest.headers.get("access_token")
-            token_record = request.env["api.access_token"].sudo().search([
-                ("token", "=", access_token)
-            ])
+            token_record = request.env["api.access_token"].sudo()._find_by_token(access_token)
             if token_record:
                 token_record.unlink()
             
@@ -102,23 +322,55 @@ class DentalClinicController(http.Controller):
     @http.route("/api/patients", methods=["GET"], type="json", auth="none", csrf=False, cors="*")
     @validate_token
     def get_patients(self, **kw):
-        """Get all patients"""
+        """Get patients, newest first.
+
+        Pass the ``next_cursor`` of a page as ``cursor`` to fetch the following
+        one; ``with_total`` adds the overall patient count to the response.
+        ``teeth`` keeps the patients with a procedure on any of these teeth.
+        Like the other read endpoints, answers ``{"not_modified": true}`` when
+        the If-None-Match header holds the ETag of the current result.
+        """
         try:
+            try:
+                fields = api_fields("patient.patient", kw.get("fields"))
+            except ValueError as e:
+                return invalid_response("invalid_fields", str(e), 400)
             limit = int(kw.get("limit", 100))
             offset = int(kw.get("offset", 0))
-            
-            patients = request.env["patient.patient"].search_read(
-                [], 
-                limit=limit, 
-                offset=offset,
-                order="create_date desc"
-            )
-            
-            return {
+            Patient = request.env["patient.patient"]
+            domain = []
+            if kw.get("teeth"):
+                try:
+                    domain.append(("treated_tooth", "in", parse_teeth(kw["teeth"])))
+                except (TypeError, ValueError) as e:
+                    return invalid_response("invalid_filter", str(e), 400)
+
+            if offset and not kw.get("cursor"):
+                # Legacy offset paging, kept for existing clients.
+                patients = Patient.search(domain, limit=limit, offset=offset, order="create_date desc, id desc")
+                next_cursor = None
+            else:
+                cursor = None
+                if kw.get("cursor"):
+                    try:
+                        create_date, record_id = decode_cursor(kw["cursor"])
+                        cursor = (datetime.datetime.fromisoformat(create_date), int(record_id))
+                    except (TypeError, ValueError):
+                        return invalid_response("invalid_cursor", "cursor is malformed", 400)
+                patients, next_cursor = Patient.search_keyset(domain, cursor=cursor, limit=limit)
+
+            total = Patient.search_count(domain) if parse_bool(kw.get("with_total")) else None
+            if conditional_json(result_etag(patients, kw, total)):
+                return NOT_MODIFIED
+
+            result = {
                 "success": True,
-                "data": patients,
-                "total": request.env["patient.patient"].search_count([])
+                "data": patients.read(fields),
+                "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
             }
+            if total is not None:
+                result["total"] = total
+            return result
         except Exception as e:
             return invalid_response("fetch_error", str(e), 500)
     
@@ -127,23 +379,69 @@ class DentalClinicController(http.Controller):
     def get_patient(self, patient_id, **kw):
         """Get specific patient"""
         try:
-            patient = request.env["patient.patient"].search_read(
-                [("id", "=", patient_id)],
-                limit=1
-            )
+            try:
+                fields = api_fields("patient.patient", kw.get("fields"))
+            except ValueError as e:
+                return invalid_response("invalid_fields", str(e), 400)
+            patient = request.env["patient.patient"].search([("id", "=", patient_id)], limit=1)
             
             if not patient:
                 return invalid_response("not_found", "Patient not found", 404)
+            if conditional_json(result_etag(patient, kw)):
+                return NOT_MODIFIED
             
             return {
                 "success": True,
-                "data": patient[0]
+                "data": patient.read(fields)[0]
+            }
+        except Exception as e:
+            return invalid_response("fetch_error", str(e), 500)
+    
+    @http.route("/api/patients/<int:patient_id>/timeline", methods=["GET"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    def get_patient_timeline(self, patient_id, **kw):
+        """Full history of a patient in one call
+        Expected JSON body: {"limit": 20, "cursor": "<next_cursor>", "fields": {"patient.appointment": [...], ...}}
+        Appointments come newest first, with their procedure lines and their
+        prescriptions (and lines) nested. Each model is read once per page.
+        """
+        try:
+            requested = kw.get("fields") or {}
+            if not isinstance(requested, dict):
+                return invalid_response("invalid_fields", "fields must map model names to field lists", 400)
+            try:
+                unknown = [model_name for model_name in requested if model_name not in TIMELINE_MODELS]
+                if unknown:
+                    raise ValueError("unknown models: %s" % ", ".join(unknown))
+                fields_by_model = {
+                    model_name: api_fields(model_name, requested.get(model_name)) for model_name in TIMELINE_MODELS
+                }
+            except ValueError as e:
+                return invalid_response("invalid_fields", str(e), 400)
+            cursor = None
+            if kw.get("cursor"):
+                try:
+                    start, record_id = decode_cursor(kw["cursor"])
+                    cursor = (datetime.datetime.fromisoformat(start), int(record_id))
+                except (TypeError, ValueError):
+                    return invalid_response("invalid_cursor", "cursor is malformed", 400)
+            patient = request.env["patient.patient"].browse(patient_id)
+            if not patient.exists():
+                return invalid_response("not_found", "Patient not found", 404)
+            limit = min(int(kw.get("limit", 20)), 200)
+            timeline = patient.get_timeline(limit=limit, cursor=cursor, fields_by_model=fields_by_model)
+            next_cursor = timeline.pop("next_cursor")
+            return {
+                "success": True,
+                "data": timeline,
+                "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
             }
         except Exception as e:
             return invalid_response("fetch_error", str(e), 500)
     
     @http.route("/api/patients", methods=["POST"], type="json", auth="none", csrf=False, cors="*")
     @validate_token
+    @idempotent
     def create_patient(self, **kw):
         """Create new patient"""
         try:
@@ -177,6 +475,68 @@ class DentalClinicController(http.Controller):
         except Exception as e:
             return invalid_response("create_error", str(e), 500)
     
+    @http.route("/api/patients/bulk", methods=["POST"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    @idempotent
+    def create_patients_bulk(self, **kw):
+        """Create many patients in one call.
+
+        Expected JSON body: {"patients": [{"patient_name": ..., "contact_number": ...}, ...]}
+        Valid rows are created with a single multi-record create, without chatter
+        tracking and with one dental.bulk.audit entry for the call; if that fails
+        the rows are retried one by one so only the offending ones are reported.
+        """
+        try:
+            rows = kw.get("patients")
+            if not isinstance(rows, list) or not rows:
+                return invalid_response("missing_field", "Field 'patients' must be a non-empty list", 400)
+            if len(rows) > BULK_MAX_ROWS:
+                return invalid_response("too_many_rows", f"At most {BULK_MAX_ROWS} patients per call", 400)
+
+            errors = []
+            pending = []
+            for index, row in enumerate(rows):
+                if not isinstance(row, dict):
+                    errors.append({"index": index, "message": "row must be an object"})
+                    continue
+                missing = [field for field in ("patient_name", "contact_number") if not row.get(field)]
+                if missing:
+                    errors.append({"index": index, "message": f"Field '{missing[0]}' is required"})
+                    continue
+                pending.append((index, {field: row[field] for field in PATIENT_WRITABLE_FIELDS if field in row}))
+
+            Patient = request.env["patient.patient"]
+            created = []
+            try:
+                with request.env.cr.savepoint():
+                    patients = Patient.bulk_create([vals for _index, vals in pending], reason="/api/patients/bulk")
+                created = list(zip([index for index, _vals in pending], patients))
+            except Exception:
+                BulkPatient = Patient.with_context(**BULK_CONTEXT)
+                for index, vals in pending:
+                    try:
+                        with request.env.cr.savepoint():
+                            created.append((index, BulkPatient.create(vals)))
+                    except Exception as e:
+                        errors.append({"index": index, "message": str(e)})
+                if created:
+                    request.env["dental.bulk.audit"]._log_batch(
+                        "patient.patient", "create", [patient.id for _index, patient in created],
+                        sorted({name for _index, vals in pending for name in vals}), reason="/api/patients/bulk")
+
+            return {
+                "success": not errors,
+                "data": {
+                    "created": [
+                        {"index": index, "id": patient.id, "patient_serial": patient.patient_serial}
+                        for index, patient in created
+                    ],
+                    "errors": sorted(errors, key=lambda error: error["index"]),
+                },
+            }
+        except Exception as e:
+            return invalid_response("create_error", str(e), 500)
+    
     @http.route("/api/patients/<int:patient_id>", methods=["PUT"], type="json", auth="none", csrf=False, cors="*")
     @validate_token
     def update_patient(self, patient_id, **kw):
@@ -223,36 +583,114 @@ class DentalClinicController(http.Controller):
         except Exception as e:
             return invalid_response("delete_error", str(e), 500)
     
+    @http.route("/api/batch", methods=["POST"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    def batch(self, **kw):
+        """Run several operations in one request and one transaction
+        Expected JSON body: {"operations": [
+            {"ref": "p", "op": "create", "resource": "patients", "values": {"patient_name": ..., ...}},
+            {"ref": "a", "op": "create", "resource": "appointments",
+             "values": {"patient_id": {"$ref": "p"}, "start": ...}},
+            {"op": "create", "resource": "procedure_lines", "savepoint": true,
+             "values": {"appointment_id": {"$ref": "a"}, "tooth_no": "Tooth17", "service_item_id": 5}},
+        ]}
+        op is create, update or delete (update and delete take a record_id).
+        Operations run in order and {"$ref": ...} stands for the id created by
+        an earlier operation. A failing operation rolls back the whole batch,
+        unless it has "savepoint": true, in which case only that operation is
+        undone and the batch goes on.
+        """
+        try:
+            operations = kw.get("operations")
+            if not isinstance(operations, list) or not operations:
+                return invalid_response("missing_field", "Field 'operations' must be a non-empty list", 400)
+            if len(operations) > BATCH_MAX_OPERATIONS:
+                return invalid_response(
+                    "too_many_operations", f"At most {BATCH_MAX_OPERATIONS} operations per batch", 400)
+
+            refs = {}
+            results = []
+            for index, operation in enumerate(operations):
+                optional = isinstance(operation, dict) and parse_bool(operation.get("savepoint"))
+                try:
+                    with request.env.cr.savepoint():
+                        record_id = run_batch_operation(operation, refs)
+                except Exception as e:
+                    results.append({"index": index, "status": "error", "message": str(e)})
+                    if optional:
+                        continue
+                    request.env.cr.rollback()
+                    return {
+                        "success": False,
+                        "message": f"Operation {index} failed, nothing was saved",
+                        "data": {"results": results},
+                    }
+                if operation.get("ref"):
+                    refs[operation["ref"]] = record_id
+                results.append({"index": index, "status": "ok", "id": record_id, "ref": operation.get("ref")})
+
+            return {
+                "success": all(result["status"] == "ok" for result in results),
+                "data": {"results": results},
+            }
+        except Exception as e:
+            request.env.cr.rollback()
+            return invalid_response("batch_error", str(e), 500)
+    
     # Appointment endpoints
     @http.route("/api/appointments", methods=["GET"], type="json", auth="none", csrf=False, cors="*")
     @validate_token
+    @rate_limit_class("export")
     def get_appointments(self, **kw):
         """Get appointments with optional filters"""
         try:
-            domain = []
-            
-            # Add date filters if provided
-            if kw.get("date_from"):
-                domain.append(("start", ">=", kw.get("date_from")))
-            if kw.get("date_to"):
-                domain.append(("start", "<=", kw.get("date_to")))
-            if kw.get("patient_id"):
-                domain.append(("patient_id", "=", int(kw.get("patient_id"))))
-            
-            appointments = request.env["patient.appointment"].search_read(
-                domain,
-                order="start desc"
-            )
+            try:
+                fields = api_fields("patient.appointment", kw.get("fields"))
+            except ValueError as e:
+                return invalid_response("invalid_fields", str(e), 400)
+            try:
+                domain = appointment_domain(kw)
+            except (TypeError, ValueError) as e:
+                return invalid_response("invalid_filter", str(e), 400)
+            # Unbounded listing: one aggregate, a 304 must not read the appointments.
+            if conditional_json(domain_etag("patient.appointment", domain, kw)):
+                return NOT_MODIFIED
+            appointments = request.env["patient.appointment"].search(domain, order="start desc")
             
             return {
                 "success": True,
-                "data": appointments
+                "data": appointments.read(fields)
             }
         except Exception as e:
             return invalid_response("fetch_error", str(e), 500)
     
+    @http.route("/api/appointments/stream", methods=["GET"], type="http", auth="none", csrf=False, cors="*")
+    @validate_token
+    @rate_limit_class("export")
+    def stream_appointments(self, **kw):
+        """Export appointments as newline-delimited JSON.
+
+        Takes the same filters and ``fields`` as ``/api/appointments`` in the query
+        string. Rows are streamed in id order, a batch at a time, so the worker
+        never holds the whole result set.
+        """
+        try:
+            fields = api_fields("patient.appointment", kw.get("fields"))
+        except ValueError as e:
+            return invalid_response("invalid_fields", str(e), 400)
+        try:
+            domain = appointment_domain(kw)
+        except (TypeError, ValueError) as e:
+            return invalid_response("invalid_filter", str(e), 400)
+        # The export reads the whole domain anyway.
+        etag = domain_etag("patient.appointment", domain, kw)
+        if etag_matches(etag):
+            return not_modified_response(etag)
+        return set_private_etag(ndjson_response(iter_batched_read("patient.appointment", domain, fields)), etag)
+    
     @http.route("/api/appointments", methods=["POST"], type="json", auth="none", csrf=False, cors="*")
     @validate_token
+    @idempotent
     def create_appointment(self, **kw):
         """Create new appointment"""
         try:
@@ -297,8 +735,7 @@ class DentalClinicController(http.Controller):
             
             update_vals = {}
             allowed_fields = [
-                "start", "stop", "doctor_id", "chief_complain",
-                "medical_history", "clinical_examination", "name", "state"
+                "start", "stop", "doctor_id", "chief_complaints", "name"
             ]
             
             for field in allowed_fields:
@@ -308,6 +745,20 @@ class DentalClinicController(http.Controller):
                     else:
                         update_vals[field] = kw[field]
             
+            # Status changes go through the transition rules.
+            status = kw.get("appointment_status")
+            if status and status != appointment.appointment_status:
+                transition = appointment._find_transition(appointment.appointment_status or "draft", status)
+                if not transition:
+                    return invalid_response(
+                        "invalid_transition",
+                        f"Cannot move appointment from {appointment.appointment_status} to {status}",
+                        409
+                    )
+                result = appointment.apply_transitions({appointment.id: transition})
+                if result["errors"]:
+                    return invalid_response("invalid_transition", result["errors"][0]["message"], 409)
+            
             appointment.write(update_vals)
             
             return {
@@ -317,6 +768,51 @@ class DentalClinicController(http.Controller):
         except Exception as e:
             return invalid_response("update_error", str(e), 500)
     
+    @http.route("/api/appointments/transition", methods=["POST"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    def transition_appointments(self, **kw):
+        """Move many appointments through status transitions in one call.
+
+        Expected JSON body: {"ids": [1, 2], "transition": "complete"}
+        or {"moves": {"1": "complete", "2": "cancel"}} for different transitions.
+        Transitions: confirm, start_exam, complete_exam, complete, cancel, reset_to_draft.
+        Moves not allowed from the current status are reported in errors, the
+        others are applied with one write per target status. When no move is
+        allowed at all the answer is a 409, as for a status change through
+        PUT /api/appointments/<id>.
+        """
+        try:
+            moves = kw.get("moves")
+            if moves is None:
+                ids = kw.get("ids")
+                if not isinstance(ids, list) or not kw.get("transition"):
+                    return invalid_response("missing_field", "Send 'ids' and 'transition', or 'moves'", 400)
+                moves = dict.fromkeys(ids, kw["transition"])
+            if not isinstance(moves, dict) or not moves:
+                return invalid_response("missing_field", "Field 'moves' must be a non-empty object", 400)
+            if len(moves) > BULK_MAX_ROWS:
+                return invalid_response("too_many_rows", f"At most {BULK_MAX_ROWS} appointments per call", 400)
+            try:
+                moves = {int(appointment_id): name for appointment_id, name in moves.items()}
+            except (TypeError, ValueError):
+                return invalid_response("invalid_id", "Appointment ids must be integers", 400)
+
+            result = request.env["patient.appointment"].apply_transitions(moves)
+            if result["errors"] and not result["done"]:
+                return invalid_response("invalid_transition", result["errors"][0]["message"], 409)
+            return {
+                "success": not result["errors"],
+                "data": {
+                    "done": [
+                        {"id": appointment_id, "appointment_status": status}
+                        for appointment_id, status in sorted(result["done"].items())
+                    ],
+                    "errors": result["errors"],
+                },
+            }
+        except Exception as e:
+            return invalid_response("transition_error", str(e), 500)
+    
     @http.route("/api/appointments/<int:appointment_id>", methods=["DELETE"], type="json", auth="none", csrf=False, cors="*")
     @validate_token
     def delete_appointment(self, appointment_id, **kw):
@@ -334,3 +830,158 @@ class DentalClinicController(http.Controller):
             }
         except Exception as e:
             return invalid_response("delete_error", str(e), 500)
+    
+    # Doctor availability endpoints
+    @http.route("/api/doctors/<int:doctor_id>/slots", methods=["GET"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    def get_doctor_slots(self, doctor_id, **kw):
+        """Free windows of a doctor
+        Expected JSON body: {"from": "2025-01-06 08:00:00", "to": "2025-01-11 18:00:00", "duration": 30}
+        """
+        try:
+            try:
+                date_from, date_to, duration = slot_query(kw)
+            except (TypeError, ValueError) as e:
+                return invalid_response("invalid_range", str(e), 400)
+            doctor = request.env["clinic.doctor"].browse(doctor_id)
+            if not doctor.exists():
+                return invalid_response("not_found", "Doctor not found", 404)
+            slots = doctor.search_free_slots([doctor_id], date_from, date_to, duration)
+            return {
+                "success": True,
+                "data": {"doctor_id": doctor_id, "slots": format_slots(slots[doctor_id])}
+            }
+        except Exception as e:
+            return invalid_response("fetch_error", str(e), 500)
+    
+    @http.route("/api/doctors/slots", methods=["GET"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    def get_doctors_slots(self, **kw):
+        """Free windows of several doctors at once
+        Expected JSON body: {"doctor_ids": [1, 2], "from": ..., "to": ..., "duration": 30}
+        Without doctor_ids every active doctor is searched.
+        """
+        try:
+            try:
+                date_from, date_to, duration = slot_query(kw)
+            except (TypeError, ValueError) as e:
+                return invalid_response("invalid_range", str(e), 400)
+            Doctor = request.env["clinic.doctor"]
+            doctor_ids = kw.get("doctor_ids")
+            if isinstance(doctor_ids, str):
+                doctor_ids = doctor_ids.split(",")
+            if doctor_ids:
+                doctors = Doctor.browse([int(doctor_id) for doctor_id in doctor_ids]).exists()
+            else:
+                doctors = Doctor.search([])
+            slots = Doctor.search_free_slots(doctors.ids, date_from, date_to, duration)
+            return {
+                "success": True,
+                "data": [
+                    {"doctor_id": doctor_id, "slots": format_slots(doctor_slots)}
+                    for doctor_id, doctor_slots in slots.items()
+                ]
+            }
+        except Exception as e:
+            return invalid_response("fetch_error", str(e), 500)
+    
+    # Dashboards
+    @http.route("/api/kpis", methods=["GET"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    def get_kpis(self, **kw):
+        """Clinic KPIs from the materialized dental.clinic.kpi table
+        Expected JSON body: {"from": "2025-01-01", "to": "2025-01-31", "doctor_ids": [1, 2]}
+        Defaults to the last 30 days. Figures lag the appointments by at most
+        one run of the "Refresh Clinic KPIs" cron.
+        """
+        try:
+            try:
+                date_to = Date.to_date(kw.get("to")) or Date.today()
+                date_from = Date.to_date(kw.get("from")) or date_to - datetime.timedelta(days=29)
+                doctor_ids = kw.get("doctor_ids") or []
+                if isinstance(doctor_ids, str):
+                    doctor_ids = doctor_ids.split(",")
+                doctor_ids = [int(doctor_id) for doctor_id in doctor_ids]
+            except (TypeError, ValueError) as e:
+                return invalid_response("invalid_range", str(e), 400)
+            if date_from > date_to:
+                return invalid_response("invalid_range", "'from' must not be after 'to'", 400)
+            dashboard = request.env["dental.clinic.kpi"].get_dashboard(date_from, date_to, doctor_ids)
+            return {
+                "success": True,
+                "data": dashboard
+            }
+        except Exception as e:
+            return invalid_response("fetch_error", str(e), 500)
+    
+    @http.route("/api/analytics/utilization", methods=["GET"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    @rate_limit_class("export")
+    def get_utilization(self, **kw):
+        """Chair utilization, gap fragmentation, cancellation and no-show rates per doctor
+        Expected JSON body: {"from": "2025-01-01 00:00:00", "to": "2025-12-31 23:59:59",
+        "doctor_ids": [1, 2], "min_slot": 30}
+        Defaults to the last 30 days. hour_of_week holds the utilization of each
+        hour of the week, Monday 00:00 first, null when the clinic is closed.
+        """
+        try:
+            try:
+                date_to = Datetime.to_datetime(kw.get("to")) or Datetime.now()
+                date_from = Datetime.to_datetime(kw.get("from")) or date_to - datetime.timedelta(days=30)
+                doctor_ids = kw.get("doctor_ids") or []
+                if isinstance(doctor_ids, str):
+                    doctor_ids = doctor_ids.split(",")
+                doctor_ids = [int(doctor_id) for doctor_id in doctor_ids]
+                min_slot = int(kw.get("min_slot") or DEFAULT_MIN_SLOT)
+            except (TypeError, ValueError) as e:
+                return invalid_response("invalid_range", str(e), 400)
+            if date_from >= date_to:
+                return invalid_response("invalid_range", "'from' must be before 'to'", 400)
+            analytics = request.env["dental.clinic.analytics"].compute_utilization(
+                date_from, date_to, doctor_ids=doctor_ids, min_slot=min_slot)
+            return {
+                "success": True,
+                "data": analytics
+            }
+        except Exception as e:
+            return invalid_response("fetch_error", str(e), 500)
+    
+    # Offline clients
+    @http.route("/api/sync", methods=["GET"], type="json", auth="none", csrf=False, cors="*")
+    @validate_token
+    @rate_limit_class("sync")
+    def sync(self, **kw):
+        """Records created, changed or deleted since the previous sync
+        Expected JSON body: {"since": "<next_cursor of the previous sync>", "limit": 500}
+        Without since everything is returned. Keep calling with the returned
+        next_cursor while has_more is true; rows may be sent more than once and
+        should be upserted. A 410 means the cursor is too old: resync from scratch.
+        """
+        try:
+            watermarks = None
+            if kw.get("since"):
+                try:
+                    watermarks = [
+                        (datetime.datetime.fromisoformat(watermark[0]), int(watermark[1])) if watermark else None
+                        for watermark in decode_cursor(kw["since"])
+                    ]
+                    if len(watermarks) != len(SYNC_MODELS) + 1:
+                        raise ValueError("invalid cursor")
+                except (TypeError, ValueError, IndexError):
+                    return invalid_response("invalid_cursor", "since is malformed", 400)
+            limit = min(int(kw.get("limit", 500)), 5000)
+            fields_by_model = {
+                model_name: list(API_FIELDS[model_name]["default"]) + ["write_date"] for model_name in SYNC_MODELS
+            }
+            result = request.env["dental.sync"].get_changes(watermarks, limit=limit, fields_by_model=fields_by_model)
+            if result is None:
+                return invalid_response("cursor_expired", "since is too old, a full resync is needed", 410)
+            changes, deleted, next_watermarks, has_more = result
+            return {
+                "success": True,
+                "data": dict(changes, deleted=deleted),
+                "next_cursor": encode_cursor(next_watermarks),
+                "has_more": has_more,
+            }
+        except Exception as e:
+            return invalid_response("sync_error", str(e), 500)
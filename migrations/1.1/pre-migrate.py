@@ -0,0 +1,22 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Replace raw access tokens by their SHA-256 digest.
+
+    Raw tokens are issued as ``access_token_<sha1>``; digests are plain hex, so
+    the prefix tells which rows still need hashing and makes this idempotent.
+    """
+    if not version:
+        return
+    cr.execute("""
+        UPDATE api_access_token
+           SET token = encode(sha256(convert_to(token, 'UTF8')), 'hex')
+         WHERE token LIKE 'access\\_token\\_%'
+    """)
+    _logger.info("Hashed %s stored API access tokens", cr.rowcount)
+    # The unique constraint already indexes the column.
+    cr.execute("DROP INDEX IF EXISTS api_access_token__token_index")
+    cr.execute("DROP INDEX IF EXISTS api_access_token_token_index")
@@ -1,7 +1,17 @@
+from . import bulk_operation
 from . import patient
 from . import patient_appointment
 from . import appointment_dental_procedure_line
 from . import clinic_doctor
 from . import appointment_attachment_line
 from . import patient_prescription
-from . import access_token
\ No newline at end of file
+from . import access_token
+from . import ir_http
+from . import ir_sequence
+from . import clinic_benchmark
+from . import delta_sync
+from . import clinic_kpi
+from . import clinic_watermark
+from . import clinic_analytics
+from . import idempotency_key
+from . import rate_limit
@@ -1,17 +1,95 @@
 import hashlib
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from datetime import timedelta
 
 from odoo import api, fields, models
-from odoo.tools import DEFAULT_SERVER_DATETIME_FORMAT
+from odoo.tools import DEFAULT_SERVER_DATETIME_FORMAT, config
 
 _logger = logging.getLogger(__name__)
 
+# Per-worker token cache, keyed on (database, token digest). Entries are dropped
+# at the token expiry date, after TOKEN_CACHE_TTL seconds, or once the token is
+# written or deleted in any worker: see APIAccessToken._evict_revoked_tokens().
+TOKEN_CACHE_SIZE = 4096
+TOKEN_CACHE_TTL = 300
+# Revocations are looked up this far back from the latest one seen, for those
+# whose transaction started earlier but committed later.
+TOKEN_REVOCATION_OVERLAP = 60
+
+TokenInfo = namedtuple("TokenInfo", ["user_id", "token_expiry_date", "scope"])
+
+
 def random_token(length=40, prefix="access_token"):
     rbytes = os.urandom(length)
     return "{}_{}".format(prefix, hashlib.sha1(rbytes).hexdigest())
 
+
+def hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache(object):
+    """Thread-safe LRU of (dbname, digest) -> TokenInfo, local to the worker
+    process."""
+
+    def __init__(self, size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                info, deadline = entry
+                if time.monotonic() < deadline and fields.Datetime.now() < info.token_expiry_date:
+                    self._entries.move_to_end(token)
+                    self.hits += 1
+                    return info
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def put(self, token, info):
+        with self._lock:
+            self._entries[token] = (info, time.monotonic() + self.ttl)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tokens):
+        with self._lock:
+            for token in tokens:
+                self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache()
+# Latest revocation seen by this worker, per database.
+revocations_seen = {}
+
 class APIAccessToken(models.Model):
     _name = "api.access_token"
     _description = "API Access Token"
@@ -19,32 +97,148 @@ class APIAccessToken(models.Model):
         ('token_unique', 'unique(token)', 'The access token must be unique.')
     ]
 
-    token = fields.Char("Access Token", required=True, index=True)
+    # SHA-256 hex digest of the token handed to the client; the raw value is never
+    # stored. The unique constraint provides the lookup index.
+    token = fields.Char("Access Token", size=64, required=True)
     user_id = fields.Many2one("res.users", string="User", required=True, ondelete='cascade')
-    token_expiry_date = fields.Datetime(string="Token Expiry Date", required=True)
+    token_expiry_date = fields.Datetime(string="Token Expiry Date", required=True, index=True)
     scope = fields.Char(string="Scope")
 
     def find_or_create_token(self, user_id=None, create=False):
+        """Only the digest of a token is stored, so an existing token can never be
+        handed out again: with ``create`` a fresh token is issued and its raw value
+        returned, otherwise None is returned."""
         if not user_id:
             user_id = self.env.user.id
+        if not create:
+            return None
+        return self.create_token(user_id)
 
-        access_token = self.env["api.access_token"].sudo().search([("user_id", "=", user_id)], order="id DESC", limit=1)
-        if access_token and access_token.has_expired():
-            access_token = None
-
-        if not access_token and create:
-            expiry_dt = fields.Datetime.from_string(fields.Datetime.now()) + timedelta(days=1)
-            token_expiry_date = expiry_dt.strftime(DEFAULT_SERVER_DATETIME_FORMAT)
-            vals = {
-                "user_id": user_id,
-                "scope": "userinfo",
-                "token_expiry_date": token_expiry_date,
-                "token": random_token(),
-            }
-            access_token = self.env["api.access_token"].sudo().create(vals)
-        if not access_token:
+    @api.model
+    def create_token(self, user_id, scope="userinfo"):
+        """Issue a new token for ``user_id`` and return its raw value."""
+        expiry_dt = fields.Datetime.from_string(fields.Datetime.now()) + timedelta(days=1)
+        token_expiry_date = expiry_dt.strftime(DEFAULT_SERVER_DATETIME_FORMAT)
+        raw_token = random_token()
+        self.env["api.access_token"].sudo().create({
+            "user_id": user_id,
+            "scope": scope,
+            "token_expiry_date": token_expiry_date,
+            "token": hash_token(raw_token),
+        })
+        return raw_token
+
+    @api.model
+    def _find_by_token(self, token):
+        """Exact-match lookup of a raw token: a single probe on the unique index."""
+        if not token:
+            return self.browse()
+        self.env.cr.execute("SELECT id FROM api_access_token WHERE token = %s", (hash_token(token),))
+        row = self.env.cr.fetchone()
+        return self.browse(row[0] if row else [])
+
+    @api.model
+    def _get_token_info(self, token):
+        """Return the TokenInfo of a live token, going through the worker cache."""
+        if not token:
+            return None
+        key = (self.env.cr.dbname, hash_token(token))
+        self._evict_revoked_tokens()
+        info = token_cache.get(key)
+        if info is not None:
+            return info
+        access_token = self.sudo()._find_by_token(token)
+        if not access_token or access_token.has_expired():
             return None
-        return access_token.token
+        info = TokenInfo(access_token.user_id.id, access_token.token_expiry_date, access_token.scope or "")
+        token_cache.put(key, info)
+        return info
+
+    @api.model
+    def _evict_revoked_tokens(self):
+        """Drop from the worker cache the tokens written or deleted by any
+        worker since the previous call: one probe of the revocation index,
+        which finds nothing most of the time."""
+        dbname = self.env.cr.dbname
+        seen = revocations_seen.get(dbname)
+        if seen is None:
+            # Nothing of this database is cached yet.
+            self.env.cr.execute("SELECT now() AT TIME ZONE 'UTC'")
+            revocations_seen[dbname] = self.env.cr.fetchone()[0]
+            return
+        self.env.cr.execute(
+            "SELECT token, revoked_at FROM api_access_token_revocation WHERE revoked_at > %s",
+            [seen - timedelta(seconds=TOKEN_REVOCATION_OVERLAP)],
+        )
+        rows = self.env.cr.fetchall()
+        if rows:
+            token_cache.invalidate([(dbname, token) for token, _revoked_at in rows])
+            revocations_seen[dbname] = max(seen, max(revoked_at for _token, revoked_at in rows))
+
+    def _revoke_tokens(self, digests):
+        """Evict ``digests`` here and have the other workers evict them at
+        their next request."""
+        if not digests:
+            return
+        token_cache.invalidate([(self.env.cr.dbname, digest) for digest in digests])
+        self.env.cr.execute("""
+            INSERT INTO api_access_token_revocation (token, revoked_at)
+            SELECT unnest(%s::varchar[]), now() AT TIME ZONE 'UTC'
+        """, [list(digests)])
+
+    @api.model
+    def get_token_cache_stats(self):
+        return token_cache.stats()
+
+    def write(self, vals):
+        self._revoke_tokens(self.mapped("token"))
+        return super(APIAccessToken, self).write(vals)
+
+    def unlink(self):
+        self._revoke_tokens(self.mapped("token"))
+        return super(APIAccessToken, self).unlink()
+
+    @api.model
+    def cleanup_expired_tokens(self, batch_size=1000, time_budget=None):
+        """Delete expired tokens in chunks of ``batch_size``, committing after each
+        chunk so the table is never locked for long. Stops once ``time_budget``
+        seconds (by default half the cron time limit) are spent and asks the cron
+        to run again for the remainder."""
+        if time_budget is None:
+            cron_limit = config.get("limit_time_real_cron") or -1
+            if cron_limit <= 0:
+                cron_limit = config.get("limit_time_real") or 120
+            time_budget = cron_limit / 2
+        auto_commit = not getattr(threading.current_thread(), "testing", False)
+        started = time.monotonic()
+        deleted = 0
+        exhausted = False
+        while not exhausted and time.monotonic() - started < time_budget:
+            self.env.cr.execute("""
+                DELETE FROM api_access_token
+                 WHERE id IN (
+                    SELECT id FROM api_access_token
+                     WHERE token_expiry_date < (now() AT TIME ZONE 'UTC')
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+                 )
+             RETURNING token
+            """, (batch_size,))
+            tokens = [row[0] for row in self.env.cr.fetchall()]
+            # Expired already: no need to signal the other workers.
+            token_cache.invalidate([(self.env.cr.dbname, token) for token in tokens])
+            deleted += len(tokens)
+            exhausted = len(tokens) < batch_size
+            if auto_commit:
+                self.env.cr.commit()
+        # Revocations are only looked up TOKEN_REVOCATION_OVERLAP seconds back.
+        self.env.cr.execute(
+            "DELETE FROM api_access_token_revocation WHERE revoked_at < (now() AT TIME ZONE 'UTC') - interval '1 day'")
+        self.invalidate_model()
+        elapsed = time.monotonic() - started
+        _logger.info("Purged %s expired API access tokens in %.2fs", deleted, elapsed)
+        self.env["ir.cron"]._notify_progress(done=deleted, remaining=0 if exhausted else 1)
+        return {"deleted": deleted, "elapsed": round(elapsed, 3)}
 
     def is_valid(self, scopes=None):
         self.ensure_one()
@@ -65,6 +259,17 @@ class APIAccessToken(models.Model):
         return resource_scopes.issubset(provided_scopes)
 
 
+class APIAccessTokenRevocation(models.Model):
+    """Digest of a token written or deleted, telling the other workers to
+    drop it from their cache; see APIAccessToken._evict_revoked_tokens()."""
+    _name = "api.access_token.revocation"
+    _description = "API Access Token Revocation"
+    _log_access = False
+
+    token = fields.Char("Access Token", size=64, required=True)
+    revoked_at = fields.Datetime("Revoked At", required=True, index=True)
+
+
 class Users(models.Model):
     _inherit = "res.users"
 
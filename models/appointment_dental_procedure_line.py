@@ -1,5 +1,33 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools.sql import create_index
+
+TOOTH_COUNT = 32
+
+
+def tooth_bit(tooth):
+    """Bit of ``tooth`` (1-32 or 'Tooth1'-'Tooth32') in a tooth mask, as the
+    signed 32-bit value PostgreSQL stores: Tooth32 is the sign bit."""
+    if isinstance(tooth, str) and tooth.startswith('Tooth'):
+        tooth = tooth[len('Tooth'):]
+    tooth = int(tooth)
+    if not 1 <= tooth <= TOOTH_COUNT:
+        raise ValueError(_("Tooth number must be between 1 and %s.", TOOTH_COUNT))
+    bit = 1 << (tooth - 1)
+    return bit - (1 << 32) if bit >= 1 << 31 else bit
+
+
+def teeth_to_mask(teeth):
+    mask = 0
+    for tooth in teeth:
+        mask |= tooth_bit(tooth) & 0xFFFFFFFF
+    return mask - (1 << 32) if mask >= 1 << 31 else mask
+
+
+def mask_to_teeth(mask):
+    """Tooth numbers (1-32) set in ``mask``."""
+    mask = (mask or 0) & 0xFFFFFFFF
+    return [tooth for tooth in range(1, TOOTH_COUNT + 1) if mask & (1 << (tooth - 1))]
 
 class AppointmentDentalProcedureLine(models.Model):
     _name = 'appointment.dental.procedure.line'
@@ -35,3 +63,12 @@ class AppointmentDentalProcedureLine(models.Model):
         store=True,
         readonly=True
     )
+
+    def init(self):
+        # Delta sync watermarks.
+        create_index(self._cr, 'appointment_dental_procedure_line_write_date_id_index', self._table, ['write_date', 'id'])
+
+    def unlink(self):
+        self.env['dental.sync.tombstone']._record_deletion(self)
+        self.env['dental.clinic.kpi.dirty']._mark_appointments(self.appointment_id)
+        return super(AppointmentDentalProcedureLine, self).unlink()
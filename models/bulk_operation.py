@@ -0,0 +1,81 @@
+import json
+
+from odoo import api, fields, models
+
+# Context of the bulk operations: no tracking values, no chatter messages and
+# no follower notifications per record.
+BULK_CONTEXT = {
+    "tracking_disable": True,
+    "mail_create_nolog": True,
+    "mail_notrack": True,
+    "mail_auto_subscribe_no_notify": True,
+}
+
+
+class BulkAudit(models.Model):
+    """Summary of a bulk operation, standing for the per-record tracking the
+    operation skipped."""
+    _name = "dental.bulk.audit"
+    _description = "Bulk Operation Audit"
+    _order = "id desc"
+
+    res_model = fields.Char("Model", required=True, index=True)
+    operation = fields.Selection([
+        ('create', 'Create'),
+        ('write', 'Write'),
+    ], string="Operation", required=True)
+    record_count = fields.Integer("Records")
+    res_ids = fields.Text("Record IDs", help="JSON list of the ids of the records")
+    changes = fields.Text("Changes", help="JSON list of {ids, values} written, or of the created field names")
+    reason = fields.Char("Reason")
+
+    @api.model
+    def _log_batch(self, res_model, operation, ids, changes, reason=None):
+        return self.sudo().create({
+            "res_model": res_model,
+            "operation": operation,
+            "record_count": len(ids),
+            "res_ids": json.dumps(ids),
+            "changes": json.dumps(changes, default=str),
+            "reason": reason,
+        })
+
+
+class BulkMixin(models.AbstractModel):
+    """Writes for mass reschedules and imports: the per-record tracking and
+    chatter messages of mail.thread are skipped and a single dental.bulk.audit
+    entry is written for the whole batch instead."""
+    _name = "dental.bulk.mixin"
+    _description = "Bulk Operations"
+
+    @api.model
+    def bulk_create(self, vals_list, reason=None):
+        records = self.with_context(**BULK_CONTEXT).create(vals_list)
+        field_names = sorted({name for vals in vals_list for name in vals})
+        self.env["dental.bulk.audit"]._log_batch(self._name, "create", records.ids, field_names, reason)
+        return records.with_env(self.env)
+
+    def bulk_write(self, vals, reason=None):
+        """Write ``vals`` on all the records of ``self``."""
+        self.with_context(**BULK_CONTEXT).write(vals)
+        self.env["dental.bulk.audit"]._log_batch(
+            self._name, "write", self.ids, [{"ids": self.ids, "values": vals}], reason)
+        return True
+
+    @api.model
+    def bulk_update(self, updates, reason=None):
+        """Write different values on different records, ``updates`` mapping
+        record ids to their values; records getting the same values are
+        written together."""
+        groups = {}
+        for record_id, vals in updates.items():
+            key = json.dumps(vals, sort_keys=True, default=str)
+            groups.setdefault(key, (vals, []))[1].append(int(record_id))
+        Model = self.with_context(**BULK_CONTEXT)
+        for vals, ids in groups.values():
+            Model.browse(ids).write(vals)
+        ids = [record_id for _vals, group_ids in groups.values() for record_id in group_ids]
+        self.env["dental.bulk.audit"]._log_batch(
+            self._name, "write", ids, [{"ids": group_ids, "values": vals} for vals, group_ids in groups.values()],
+            reason)
+        return True
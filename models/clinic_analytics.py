@@ -0,0 +1,262 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+OPENING_HOURS_PARAM = 'dental_clinic.opening_hours'
+OPEN_WEEKDAYS_PARAM = 'dental_clinic.open_weekdays'
+DEFAULT_OPENING_HOURS = '8-18'
+DEFAULT_OPEN_WEEKDAYS = '0,1,2,3,4,5'  # Monday to Saturday
+# Gaps between two appointments shorter than this many minutes cannot be booked.
+DEFAULT_MIN_SLOT = 30
+HOURS_PER_WEEK = 168
+EPOCH = datetime(1970, 1, 1)
+
+
+def hour_of_week(hour):
+    """Hour of the week (0 is Monday 00:00) of ``hour``, counted in hours since
+    the epoch, a Thursday; works on ints and NumPy arrays alike."""
+    return ((hour // 24 + 3) % 7) * 24 + hour % 24
+
+
+def ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else 0.0
+
+
+class ClinicAnalytics(models.AbstractModel):
+    """Chair utilization and no-show analytics per doctor.
+
+    For each doctor over a date range: booked hours against the hours the
+    clinic is open (``dental_clinic.opening_hours``, e.g. "8-18", on the
+    ``dental_clinic.open_weekdays``, 0 being Monday), per hour of the week too;
+    the idle gaps between appointments of a same day and how many of them are
+    too short to book; the cancellation rate and the no-show rate, a no-show
+    being a past appointment left draft or confirmed.
+
+    Times are wall-clock times in ``tz``. The appointment intervals are loaded
+    in one query into NumPy arrays and every figure is computed vectorized;
+    without NumPy the same figures come from a loop over the records.
+    """
+    _name = 'dental.clinic.analytics'
+    _description = 'Clinic Utilization Analytics'
+
+    @api.model
+    def _get_opening(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            open_from, open_to = [int(hour) for hour in
+                                  ICP.get_param(OPENING_HOURS_PARAM, DEFAULT_OPENING_HOURS).split('-')]
+            weekdays = {int(day) for day in ICP.get_param(OPEN_WEEKDAYS_PARAM, DEFAULT_OPEN_WEEKDAYS).split(',')}
+        except ValueError:
+            raise UserError(_("Opening hours must look like 8-18 and open weekdays like 0,1,2,3,4."))
+        return open_from, open_to, weekdays
+
+    @api.model
+    def compute_utilization(self, date_from, date_to, doctor_ids=None, min_slot=DEFAULT_MIN_SLOT, tz=None):
+        """Return ``{'doctors': [...], 'available_hours_by_hour_of_week': [...]}`` for the
+        appointments between ``date_from`` and ``date_to`` (naive UTC
+        datetimes); see the class docstring for the figures."""
+        if date_to <= date_from:
+            raise UserError(_("The end of the analysis range must be after its start."))
+        tz = tz or self.env.user.tz or 'UTC'
+        if numpy is None:
+            return self._compute_utilization_loop(date_from, date_to, doctor_ids, min_slot, tz)
+        self.env['patient.appointment'].check_access('read')
+        self.env['patient.appointment'].flush_model(['doctor_id', 'start', 'stop', 'appointment_status'])
+        open_from, open_to, weekdays = self._get_opening()
+        cr = self.env.cr
+        cr.execute("""
+            SELECT EXTRACT(EPOCH FROM (%(from)s AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s)),
+                   EXTRACT(EPOCH FROM (%(to)s AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s))
+        """, {'from': date_from, 'to': date_to, 'tz': tz})
+        range_start, range_stop = [float(value) for value in cr.fetchone()]
+        doctor_filter = "AND doctor_id = ANY(%(doctor_ids)s)" if doctor_ids else ""
+        cr.execute("""
+            SELECT doctor_id,
+                   EXTRACT(EPOCH FROM (start AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s)),
+                   EXTRACT(EPOCH FROM (stop AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s)),
+                   appointment_status IS NOT DISTINCT FROM 'cancelled',
+                   stop < (now() AT TIME ZONE 'UTC'),
+                   COALESCE(appointment_status, 'draft') IN ('draft', 'confirm')
+              FROM patient_appointment
+             WHERE doctor_id IS NOT NULL AND start < %(to)s AND stop > %(from)s {doctor_filter}
+             ORDER BY doctor_id, start
+        """.format(doctor_filter=doctor_filter),
+            {'from': date_from, 'to': date_to, 'tz': tz, 'doctor_ids': list(doctor_ids or [])})
+        rows = cr.fetchall()
+        data = numpy.array(rows, dtype=float).reshape(-1, 6)
+        doctor, start, stop = data[:, 0].astype(numpy.int64), data[:, 1], data[:, 2]
+        cancelled, past, pending = data[:, 3].astype(bool), data[:, 4].astype(bool), data[:, 5].astype(bool)
+        start, stop = numpy.clip(start, range_start, range_stop), numpy.clip(stop, range_start, range_stop)
+
+        doctor_ids = sorted(set(doctor_ids or []) | set(doctor.tolist()))
+        doctor_index = numpy.searchsorted(doctor_ids, doctor)
+        count = len(doctor_ids)
+        booked = ~cancelled
+
+        # Every clinic hour of the range, with the seconds of it inside the range.
+        first_hour, last_hour = int(range_start // 3600), int(-(-range_stop // 3600))
+        hours = numpy.arange(first_hour, last_hour)
+        hour_seconds = numpy.minimum(range_stop, (hours + 1) * 3600.0) - numpy.maximum(range_start, hours * 3600.0)
+        hours_how = hour_of_week(hours)
+        is_open = numpy.isin(hours_how // 24, list(weekdays)) & (hours_how % 24 >= open_from) & (hours_how % 24 < open_to)
+        available_how = numpy.bincount(hours_how, weights=hour_seconds * is_open, minlength=HOURS_PER_WEEK) / 3600
+
+        # Split the booked appointments into the clock hours they cover.
+        b_start, b_stop, b_doctor = start[booked], stop[booked], doctor_index[booked]
+        b_first = (b_start // 3600).astype(numpy.int64)
+        spans = numpy.maximum((-(-b_stop // 3600)).astype(numpy.int64) - b_first, 0)
+        piece = numpy.repeat(numpy.arange(len(b_start)), spans)
+        piece_hour = b_first[piece] + numpy.arange(spans.sum()) - numpy.repeat(numpy.cumsum(spans) - spans, spans)
+        piece_seconds = (numpy.minimum(b_stop[piece], (piece_hour + 1) * 3600.0)
+                         - numpy.maximum(b_start[piece], piece_hour * 3600.0))
+        booked_how = numpy.bincount(
+            b_doctor[piece] * HOURS_PER_WEEK + hour_of_week(piece_hour), weights=piece_seconds,
+            minlength=count * HOURS_PER_WEEK,
+        ).reshape(count, HOURS_PER_WEEK) / 3600
+
+        # Idle time between consecutive appointments of a doctor on a same day.
+        gap = b_start[1:] - b_stop[:-1]
+        same_day = (b_doctor[1:] == b_doctor[:-1]) & (b_start[1:] // 86400 == b_stop[:-1] // 86400) & (gap > 0)
+        gap, gap_doctor = gap[same_day], b_doctor[1:][same_day]
+        gap_count = numpy.bincount(gap_doctor, minlength=count)
+        idle = numpy.bincount(gap_doctor, weights=gap, minlength=count) / 3600
+        short_idle = numpy.bincount(gap_doctor, weights=gap * (gap < min_slot * 60), minlength=count) / 3600
+
+        total = numpy.bincount(doctor_index, minlength=count)
+        cancelled_count = numpy.bincount(doctor_index, weights=cancelled, minlength=count)
+        due = booked & past
+        due_count = numpy.bincount(doctor_index, weights=due, minlength=count)
+        no_show_count = numpy.bincount(doctor_index, weights=due & pending, minlength=count)
+
+        return self._format_utilization(doctor_ids, {
+            'appointments': total.tolist(),
+            'booked_hours': booked_how.sum(axis=1).tolist(),
+            'available_hours': [float(available_how.sum())] * count,
+            'cancelled': cancelled_count.tolist(),
+            'due': due_count.tolist(),
+            'no_shows': no_show_count.tolist(),
+            'gap_count': gap_count.tolist(),
+            'idle_hours': idle.tolist(),
+            'short_gap_hours': short_idle.tolist(),
+            'booked_how': booked_how.tolist(),
+            'available_how': available_how.tolist(),
+        })
+
+    @api.model
+    def _compute_utilization_loop(self, date_from, date_to, doctor_ids=None, min_slot=DEFAULT_MIN_SLOT, tz=None):
+        """Same figures as compute_utilization() from a plain loop over the
+        appointment records: the fallback without NumPy and the baseline of
+        bench_analytics()."""
+        tz = pytz.timezone(tz or self.env.user.tz or 'UTC')
+        open_from, open_to, weekdays = self._get_opening()
+
+        def local_seconds(value):
+            return (pytz.utc.localize(value).astimezone(tz).replace(tzinfo=None) - EPOCH).total_seconds()
+
+        range_start, range_stop = local_seconds(date_from), local_seconds(date_to)
+        now = fields.Datetime.now()
+        domain = [('doctor_id', '!=', False), ('start', '<', date_to), ('stop', '>', date_from)]
+        if doctor_ids:
+            domain.append(('doctor_id', 'in', list(doctor_ids)))
+        appointments = self.env['patient.appointment'].search(domain, order='start')
+        doctor_ids = sorted(set(doctor_ids or []) | set(appointments.doctor_id.ids))
+        stat_keys = ('appointments', 'booked_hours', 'cancelled', 'due', 'no_shows',
+                     'gap_count', 'idle_hours', 'short_gap_hours')
+        stats = {doctor_id: dict.fromkeys(stat_keys, 0) for doctor_id in doctor_ids}
+        for doctor_stats in stats.values():
+            doctor_stats['booked_how'] = [0.0] * HOURS_PER_WEEK
+
+        available_how = [0.0] * HOURS_PER_WEEK
+        for hour in range(int(range_start // 3600), int(-(-range_stop // 3600))):
+            how = hour_of_week(hour)
+            if how // 24 in weekdays and open_from <= how % 24 < open_to:
+                available_how[how] += (min(range_stop, (hour + 1) * 3600) - max(range_start, hour * 3600)) / 3600
+
+        previous_stop = {}
+        for appointment in appointments:
+            doctor = stats[appointment.doctor_id.id]
+            doctor['appointments'] += 1
+            status = appointment.appointment_status or 'draft'
+            if status == 'cancelled':
+                doctor['cancelled'] += 1
+                continue
+            if appointment.stop < now:
+                doctor['due'] += 1
+                if status in ('draft', 'confirm'):
+                    doctor['no_shows'] += 1
+            start = min(max(local_seconds(appointment.start), range_start), range_stop)
+            stop = min(max(local_seconds(appointment.stop), range_start), range_stop)
+            hour = int(start // 3600)
+            while hour * 3600 < stop:
+                seconds = min(stop, (hour + 1) * 3600) - max(start, hour * 3600)
+                doctor['booked_how'][hour_of_week(hour)] += seconds / 3600
+                doctor['booked_hours'] += seconds / 3600
+                hour += 1
+            previous = previous_stop.get(appointment.doctor_id.id)
+            if previous is not None and previous // 86400 == start // 86400:
+                gap = start - previous
+                if gap > 0:
+                    doctor['gap_count'] += 1
+                    doctor['idle_hours'] += gap / 3600
+                    if gap < min_slot * 60:
+                        doctor['short_gap_hours'] += gap / 3600
+            previous_stop[appointment.doctor_id.id] = stop
+
+        columns = {key: [stats[doctor_id][key] for doctor_id in doctor_ids] for key in stat_keys + ('booked_how',)}
+        columns['available_hours'] = [sum(available_how)] * len(doctor_ids)
+        columns['available_how'] = available_how
+        return self._format_utilization(doctor_ids, columns)
+
+    @api.model
+    def _format_utilization(self, doctor_ids, columns):
+        doctors = self.env['clinic.doctor'].browse(doctor_ids)
+        available_how = columns['available_how']
+        result = []
+        for index, doctor in enumerate(doctors):
+            booked_how = columns['booked_how'][index]
+            result.append({
+                'doctor_id': doctor.id,
+                'doctor_name': doctor.doctor_name,
+                'appointments': int(columns['appointments'][index]),
+                'booked_hours': round(columns['booked_hours'][index], 2),
+                'available_hours': round(columns['available_hours'][index], 2),
+                'utilization': ratio(columns['booked_hours'][index], columns['available_hours'][index]),
+                'cancellation_rate': ratio(columns['cancelled'][index], columns['appointments'][index]),
+                'no_show_rate': ratio(columns['no_shows'][index], columns['due'][index]),
+                'gap_count': int(columns['gap_count'][index]),
+                'mean_gap_hours': round(ratio(columns['idle_hours'][index], columns['gap_count'][index]), 2),
+                'short_gap_hours': round(columns['short_gap_hours'][index], 2),
+                'fragmentation': ratio(columns['short_gap_hours'][index], columns['idle_hours'][index]),
+                'hour_of_week': [ratio(booked, available) if available else None
+                                 for booked, available in zip(booked_how, available_how)],
+            })
+        return {'doctors': result, 'available_hours_by_hour_of_week': [round(hours, 2) for hours in available_how]}
+
+
+class ClinicUtilizationReport(models.AbstractModel):
+    _name = 'report.dental_clinic.report_clinic_utilization'
+    _description = 'Clinic Utilization Report'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        data = data or {}
+        date_to = fields.Datetime.to_datetime(data.get('date_to')) or fields.Datetime.now()
+        date_from = fields.Datetime.to_datetime(data.get('date_from')) or date_to - timedelta(days=30)
+        analytics = self.env['dental.clinic.analytics'].compute_utilization(
+            date_from, date_to, doctor_ids=docids or None, min_slot=data.get('min_slot', DEFAULT_MIN_SLOT))
+        return {
+            'doc_ids': docids,
+            'doc_model': 'clinic.doctor',
+            'docs': self.env['clinic.doctor'].browse(docids),
+            'date_from': date_from,
+            'date_to': date_to,
+            'analytics': analytics,
+        }
@@ -0,0 +1,365 @@
+import json
+import logging
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from psycopg2 import errors
+
+from odoo import api, fields, models, release, _
+from odoo.exceptions import UserError
+
+from .access_token import token_cache
+from .clinic_analytics import numpy
+from .ir_sequence import SERIAL_MODES, SERIAL_MODE_PARAM
+
+_logger = logging.getLogger(__name__)
+
+
+BENCHMARK_MODELS = (
+    "patient.patient",
+    "clinic.doctor",
+    "patient.appointment",
+    "appointment.dental.procedure.line",
+    "patient.prescription",
+)
+
+
+class ClinicBenchmark(models.AbstractModel):
+    """Performance probes for the clinic hot paths, meant to be run from
+    ``odoo-bin shell`` against a copy of a production database or one filled
+    with ``odoo-bin populate --models patient.appointment,... --size medium``.
+    Some of them commit their own transactions, do not run them on a live
+    database.
+
+    Example::
+
+        env["dental.clinic.benchmark"].run_benchmarks("/tmp/bench-1.1.json")
+        env["dental.clinic.benchmark"].compare_benchmarks("/tmp/bench-1.0.json", "/tmp/bench-1.1.json")
+    """
+    _name = "dental.clinic.benchmark"
+    _description = "Dental Clinic Benchmarks"
+
+    @api.model
+    def _time(self, name, func, iterations, setup=None):
+        """Run ``func`` ``iterations`` times with a cold record cache and return
+        its timing summary in milliseconds."""
+        timings = []
+        for _i in range(iterations):
+            self.env.invalidate_all()
+            if setup:
+                setup()
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        result = {
+            "name": name,
+            "iterations": iterations,
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "p50_ms": round(timings[len(timings) // 2], 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            "min_ms": round(timings[0], 3),
+            "max_ms": round(timings[-1], 3),
+        }
+        _logger.info("Benchmark %s", result)
+        return result
+
+    @api.model
+    def run_benchmarks(self, output_path=None, iterations=20):
+        """Time the hot paths of the module on the current data and return the
+        results; with ``output_path`` they are also written there as JSON.
+        Everything is rolled back."""
+        results = []
+        with self.env.cr.savepoint() as savepoint:
+            results += self._bench_token_validation(iterations)
+            results += self._bench_patient_listing(iterations)
+            results += self._bench_appointment_range(iterations)
+            results += self._bench_create(iterations)
+            results += self._bench_tooth_chart(iterations)
+            results += self.bench_serializers(iterations=iterations)
+            savepoint.rollback()
+        self.env.invalidate_all()
+        report = {
+            "module_version": self.env["ir.module.module"].sudo().search(
+                [("name", "=", "dental_clinic")], limit=1).latest_version,
+            "odoo_version": release.version,
+            "database": self.env.cr.dbname,
+            "timestamp": fields.Datetime.to_string(fields.Datetime.now()),
+            "record_counts": {model: self.env[model].search_count([]) for model in BENCHMARK_MODELS},
+            "results": results,
+        }
+        if output_path:
+            with open(output_path, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+        return report
+
+    @api.model
+    def compare_benchmarks(self, baseline_path, current_path, tolerance=0.2):
+        """Return the benchmarks of ``current_path`` whose median got more than
+        ``tolerance`` (a ratio) slower than in ``baseline_path``."""
+        with open(baseline_path) as f:
+            baseline = {result["name"]: result for result in json.load(f)["results"]}
+        with open(current_path) as f:
+            current = json.load(f)["results"]
+        regressions = []
+        for result in current:
+            before = baseline.get(result["name"])
+            if before and before["p50_ms"] and result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+                regressions.append({
+                    "name": result["name"],
+                    "baseline_p50_ms": before["p50_ms"],
+                    "p50_ms": result["p50_ms"],
+                    "ratio": round(result["p50_ms"] / before["p50_ms"], 3),
+                })
+        return regressions
+
+    def _bench_token_validation(self, iterations):
+        AccessToken = self.env["api.access_token"]
+        raw_token = AccessToken.create_token(self.env.uid)
+        self.env.flush_all()
+        return [
+            self._time("token_validation_cold", lambda: AccessToken._get_token_info(raw_token), iterations,
+                       setup=token_cache.clear),
+            self._time("token_validation_cached", lambda: AccessToken._get_token_info(raw_token), iterations),
+        ]
+
+    def _bench_patient_listing(self, iterations):
+        Patient = self.env["patient.patient"]
+        fields_list = ["id", "patient_serial", "patient_name", "contact_number", "date_of_birth", "age", "gender"]
+        deep_offset = max(Patient.search_count([]) - 100, 0)
+        cursor = None
+        if deep_offset:
+            last = Patient.search([], offset=deep_offset - 1, limit=1, order="create_date desc, id desc")
+            self.env.cr.execute("SELECT create_date, id FROM patient_patient WHERE id = %s", (last.id,))
+            cursor = self.env.cr.fetchone()
+        return [
+            self._time("patient_list_first_page",
+                       lambda: Patient.search_keyset([], limit=100)[0].read(fields_list), iterations),
+            self._time("patient_list_deep_page_offset",
+                       lambda: Patient.search([], offset=deep_offset, limit=100,
+                                              order="create_date desc, id desc").read(fields_list), iterations),
+            self._time("patient_list_deep_page_cursor",
+                       lambda: Patient.search_keyset([], cursor=cursor, limit=100)[0].read(fields_list), iterations),
+            self._time("patient_count", lambda: Patient.search_count([]), iterations),
+        ]
+
+    def _bench_appointment_range(self, iterations):
+        Appointment = self.env["patient.appointment"]
+        first = Appointment.search([], order="start", limit=1)
+        date_from = first.start or fields.Datetime.now()
+        domain = [("start", ">=", date_from), ("start", "<", date_from + timedelta(days=7))]
+        fields_list = ["id", "appointment_serial", "patient_id", "doctor_id", "appointment_status", "start", "stop"]
+        doctor_ids = self.env["clinic.doctor"].search([], limit=20).ids
+        return [
+            self._time("appointment_week_range",
+                       lambda: Appointment.search_read(domain, fields_list, order="start desc"), iterations),
+            self._time("doctor_free_slots_week_20",
+                       lambda: self.env["clinic.doctor"].search_free_slots(
+                           doctor_ids, date_from, date_from + timedelta(days=7), timedelta(minutes=30)),
+                       iterations),
+        ]
+
+    def _bench_create(self, iterations, batch_size=100):
+        Appointment = self.env["patient.appointment"].with_context(tracking_disable=True)
+        # Far from populated data so the doctor availability check never clashes.
+        origin = fields.Datetime.now() + timedelta(days=3650)
+        counter = iter(range(iterations * batch_size))
+
+        def create_batch():
+            Appointment.create([
+                {"name": "benchmark", "start": origin + timedelta(hours=next(counter))}
+                for _i in range(batch_size)
+            ])
+            self.env.flush_all()
+
+        result = self._time("appointment_create_batch_%s" % batch_size, create_batch, iterations)
+        result["creates_per_second"] = round(batch_size / (result["p50_ms"] / 1000), 2) if result["p50_ms"] else None
+        return [result]
+
+    def _bench_tooth_chart(self, iterations):
+        self.env.cr.execute("""
+            SELECT appointment_id FROM appointment_dental_procedure_line
+             GROUP BY appointment_id ORDER BY count(*) DESC LIMIT 1
+        """)
+        row = self.env.cr.fetchone()
+        appointment_id = row[0] if row else 0
+        Line = self.env["appointment.dental.procedure.line"]
+        return [
+            self._time("tooth_chart_load",
+                       lambda: Line.search_read([("appointment_id", "=", appointment_id)],
+                                                ["tooth_no", "service_item_id"]),
+                       iterations),
+        ]
+
+    @api.model
+    def bench_serial_allocation(self, worker_counts=(1, 2, 4, 8), creates_per_worker=100, modes=SERIAL_MODES):
+        """Measure appointment create throughput for each serial allocation mode
+        with ``worker_counts`` concurrent transactions, each creating
+        ``creates_per_worker`` appointments one transaction at a time.
+
+        Created appointments are rolled back; serials consumed by the standard
+        and block modes are not.
+        """
+        registry = self.env.registry
+        uid = self.env.uid
+        original_mode = self.env["ir.config_parameter"].sudo().get_param(SERIAL_MODE_PARAM, "no_gap")
+        results = []
+
+        def set_mode(mode):
+            with registry.cursor() as cr:
+                api.Environment(cr, uid, {})["ir.sequence"].set_clinic_serial_mode(mode)
+
+        def worker(stats):
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, {"tracking_disable": True, "mail_create_nolog": True})
+                for _i in range(creates_per_worker):
+                    while True:
+                        try:
+                            env["patient.appointment"].create({"name": "benchmark", "start": fields.Datetime.now()})
+                            env.flush_all()
+                            break
+                        except (errors.LockNotAvailable, errors.SerializationFailure):
+                            # What the HTTP layer does with concurrency errors.
+                            stats["retries"] += 1
+                        finally:
+                            cr.rollback()
+                            env.invalidate_all()
+
+        try:
+            for mode in modes:
+                set_mode(mode)
+                for count in worker_counts:
+                    stats = [{"retries": 0} for _i in range(count)]
+                    threads = [threading.Thread(target=worker, args=(stat,)) for stat in stats]
+                    started = time.perf_counter()
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - started
+                    creates = count * creates_per_worker
+                    results.append({
+                        "mode": mode,
+                        "workers": count,
+                        "creates": creates,
+                        "seconds": round(elapsed, 4),
+                        "creates_per_second": round(creates / elapsed, 2) if elapsed else None,
+                        "retries": sum(stat["retries"] for stat in stats),
+                    })
+                    _logger.info("Serial allocation benchmark: %s", results[-1])
+        finally:
+            set_mode(original_mode)
+        return results
+
+    @api.model
+    def bench_serializers(self, sample_size=5000, iterations=20):
+        """Compare the JSON encoders of the API response helpers on real
+        ``search_read`` output of up to ``sample_size`` appointments."""
+        from ..controllers.common import SERIALIZERS
+
+        rows = self.env["patient.appointment"].search_read(
+            [], ["id", "appointment_serial", "patient_id", "doctor_id", "appointment_status",
+                 "appointment_type", "start", "stop", "duration"],
+            limit=sample_size, order="start desc")
+        payload = {"count": len(rows), "data": rows}
+        results = []
+        for name, serializer in sorted(SERIALIZERS.items()):
+            result = self._time("serialize_%s_%s_rows" % (name, len(rows)), lambda: serializer(payload), iterations)
+            result["bytes"] = len(serializer(payload))
+            results.append(result)
+        return results
+
+    @api.model
+    def bench_bulk_writes(self, count=10000):
+        """Compare tracked writes with the bulk API of dental.bulk.mixin on
+        ``count`` appointments (a reschedule, different values per record) and
+        ``count`` patients (the same value on all of them), counting the chatter
+        messages each path inserts. Missing records are created first;
+        everything is rolled back."""
+        results = []
+        with self.env.cr.savepoint() as savepoint:
+            appointments = self._bench_records("patient.appointment", count, lambda i: {
+                "name": "benchmark", "start": fields.Datetime.now() + timedelta(days=7300, hours=i),
+            })
+            patients = self._bench_records("patient.patient", count, lambda i: {
+                "patient_name": "benchmark %s" % i, "contact_number": str(i),
+            })
+            # Far from any existing booking, so the doctor availability check never clashes.
+            updates = {appointment.id: {"start": appointment.start + timedelta(days=3650)} for appointment in appointments}
+            self.env.flush_all()
+
+            def reschedule_tracked():
+                for appointment in appointments:
+                    appointment.write(updates[appointment.id])
+
+            cases = [
+                ("appointment_reschedule_tracked", reschedule_tracked),
+                ("appointment_reschedule_bulk",
+                 lambda: appointments.bulk_update(updates, reason="benchmark")),
+                ("patient_write_tracked", lambda: patients.write({"contact_number": "benchmark"})),
+                ("patient_write_bulk", lambda: patients.bulk_write({"contact_number": "benchmark"}, reason="benchmark")),
+            ]
+            for name, func in cases:
+                with self.env.cr.savepoint() as case_savepoint:
+                    self.env.cr.execute("SELECT COALESCE(MAX(id), 0) FROM mail_message")
+                    last_message_id = self.env.cr.fetchone()[0]
+                    started = time.perf_counter()
+                    func()
+                    self.env.flush_all()
+                    elapsed = time.perf_counter() - started
+                    self.env.cr.execute("SELECT count(*) FROM mail_message WHERE id > %s", [last_message_id])
+                    results.append({
+                        "name": "%s_%s" % (name, count),
+                        "seconds": round(elapsed, 4),
+                        "writes_per_second": round(count / elapsed, 2) if elapsed else None,
+                        "mail_messages": self.env.cr.fetchone()[0],
+                    })
+                    _logger.info("Bulk write benchmark: %s", results[-1])
+                    case_savepoint.rollback()
+                self.env.invalidate_all()
+            savepoint.rollback()
+        self.env.invalidate_all()
+        return results
+
+    def _bench_records(self, model, count, make_vals):
+        records = self.env[model].search([], limit=count, order="id")
+        if len(records) < count:
+            records |= self.env[model].bulk_create([make_vals(i) for i in range(count - len(records))])
+        return records
+
+    @api.model
+    def bench_analytics(self, days=365, iterations=5):
+        """Compare the vectorized utilization analytics with the loop over the
+        appointment records over the last ``days`` days (the loop being what
+        runs without NumPy), and check that both give the same figures."""
+        Analytics = self.env["dental.clinic.analytics"]
+        if numpy is None:
+            raise UserError(_("NumPy is not installed: there is no vectorized path to benchmark."))
+        date_to = fields.Datetime.now()
+        date_from = date_to - timedelta(days=days)
+        appointments = self.env["patient.appointment"].search_count([("start", "<", date_to), ("stop", ">", date_from)])
+        results = [
+            self._time("analytics_vectorized_%s_days" % days,
+                       lambda: Analytics.compute_utilization(date_from, date_to), iterations),
+            self._time("analytics_orm_loop_%s_days" % days,
+                       lambda: Analytics._compute_utilization_loop(date_from, date_to), iterations),
+        ]
+        vectorized = Analytics.compute_utilization(date_from, date_to)["doctors"]
+        looped = Analytics._compute_utilization_loop(date_from, date_to)["doctors"]
+        max_difference = max([
+            abs(a[key] - b[key])
+            for a, b in zip(vectorized, looped)
+            for key in ("booked_hours", "utilization", "cancellation_rate", "no_show_rate", "short_gap_hours")
+        ] or [0])
+        for result in results:
+            result["appointments"] = appointments
+        results.append({
+            "name": "analytics_speedup_%s_days" % days,
+            "ratio": round(results[1]["p50_ms"] / results[0]["p50_ms"], 2) if results[0]["p50_ms"] else None,
+            "same_doctors": [a["doctor_id"] for a in vectorized] == [b["doctor_id"] for b in looped],
+            "max_difference": max_difference,
+        })
+        _logger.info("Analytics benchmark: %s", results[-1])
+        return results
@@ -1,7 +1,10 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError, UserError
 
-from datetime import date, timedelta
+import itertools
+from datetime import date, datetime, timedelta
+
+import pytz
 
 class ClinicDoctor(models.Model):
     _name = "clinic.doctor"
@@ -14,3 +17,75 @@ class ClinicDoctor(models.Model):
     active = fields.Boolean(default=True)
 
     appointments = fields.One2many('patient.appointment', 'doctor_id', string="Appointments")
+
+    @api.model
+    def search_free_slots(self, doctor_ids, date_from, date_to, duration, tz=None):
+        """Return ``{doctor_id: [(start, stop), ...]}``, the windows between
+        ``date_from`` and ``date_to`` (naive UTC datetimes) at least ``duration``
+        (a timedelta) long in which the clinic is open and the doctor has no
+        appointment that is not cancelled. Opening hours are the
+        ``dental_clinic.opening_hours`` on the ``dental_clinic.open_weekdays``
+        (see dental.clinic.analytics), wall-clock times in ``tz``.
+
+        All busy intervals are read in one query on the (doctor_id, start, stop)
+        index and merged in a single pass per doctor.
+        """
+        if date_to <= date_from:
+            raise UserError(_("The end of the search range must be after its start."))
+        self.env['patient.appointment'].check_access('read')
+        self.env['patient.appointment'].flush_model(['doctor_id', 'start', 'stop', 'appointment_status'])
+        opening = self._get_opening_windows(date_from, date_to, tz or self.env.user.tz or 'UTC')
+        doctor_ids = list(doctor_ids)
+        busy = {doctor_id: [] for doctor_id in doctor_ids}
+        self.env.cr.execute("""
+            SELECT doctor_id, start, stop FROM patient_appointment
+             WHERE doctor_id = ANY(%s)
+               AND start < %s AND stop > %s
+               AND appointment_status IS DISTINCT FROM 'cancelled'
+             ORDER BY doctor_id, start
+        """, (doctor_ids, date_to, date_from))
+        for doctor_id, start, stop in self.env.cr.fetchall():
+            busy[doctor_id].append((start, stop))
+
+        slots = {}
+        for doctor_id, intervals in busy.items():
+            free = []
+            index = 0
+            for open_from, open_to in opening:
+                free_from = open_from
+                # Both lists are sorted: resume at the first appointment that
+                # may reach into this opening window.
+                while index < len(intervals) and intervals[index][1] <= open_from:
+                    index += 1
+                for start, stop in itertools.islice(intervals, index, None):
+                    if start >= open_to:
+                        break
+                    if start - free_from >= duration:
+                        free.append((free_from, start))
+                    free_from = max(free_from, stop)
+                if open_to - free_from >= duration:
+                    free.append((free_from, open_to))
+            slots[doctor_id] = free
+        return slots
+
+    @api.model
+    def _get_opening_windows(self, date_from, date_to, tz):
+        """Sorted ``(start, stop)`` naive UTC intervals in which the clinic is
+        open between ``date_from`` and ``date_to``."""
+        open_from, open_to, weekdays = self.env['dental.clinic.analytics']._get_opening()
+        tz = pytz.timezone(tz)
+
+        def to_utc(day, hour):
+            local = tz.localize(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour))
+            return local.astimezone(pytz.utc).replace(tzinfo=None)
+
+        day = pytz.utc.localize(date_from).astimezone(tz).date()
+        last_day = pytz.utc.localize(date_to).astimezone(tz).date()
+        windows = []
+        while day <= last_day:
+            if day.weekday() in weekdays:
+                start, stop = max(to_utc(day, open_from), date_from), min(to_utc(day, open_to), date_to)
+                if start < stop:
+                    windows.append((start, stop))
+            day += timedelta(days=1)
+        return windows
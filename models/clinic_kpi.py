@@ -0,0 +1,145 @@
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools.sql import create_index
+
+from .delta_sync import SYNC_SETTLE_SECONDS
+
+_logger = logging.getLogger(__name__)
+
+KPI_WATERMARK = 'clinic_kpi'
+# Fields of an appointment that move it to another (day, doctor, status) row
+# or change the figures of its row.
+KPI_FIELDS = frozenset(['start', 'stop', 'duration', 'doctor_id', 'appointment_status'])
+
+# Figures of the appointments of the given days, one row per (day, doctor, status).
+KPI_AGGREGATE_QUERY = """
+    SELECT d.day, a.doctor_id, COALESCE(a.appointment_status, 'draft'),
+           count(*), COALESCE(sum(a.duration), 0), COALESCE(sum(l.revenue), 0)
+      FROM unnest(%s::date[]) AS d(day)
+      JOIN patient_appointment a ON a.start >= d.day AND a.start < d.day + 1
+ LEFT JOIN LATERAL (SELECT sum(cost) AS revenue
+                      FROM appointment_dental_procedure_line
+                     WHERE appointment_id = a.id) l ON true
+  GROUP BY 1, 2, 3
+"""
+
+
+class ClinicKpi(models.Model):
+    """Appointment figures per day, doctor and status, materialized from
+    patient.appointment so that dashboards do not aggregate the whole history
+    on every load. Kept up to date by _refresh_kpis(), days are in UTC."""
+    _name = 'dental.clinic.kpi'
+    _description = 'Clinic KPIs'
+    _log_access = False
+    _order = 'day desc, doctor_id'
+
+    day = fields.Date('Day', required=True, readonly=True)
+    doctor_id = fields.Many2one('clinic.doctor', string='Doctor', readonly=True, ondelete='cascade')
+    appointment_status = fields.Selection(
+        lambda self: self.env['patient.appointment']._fields['appointment_status'].selection,
+        string='Appointment Status', readonly=True)
+    appointment_count = fields.Integer('Appointments', readonly=True, aggregator='sum')
+    booked_hours = fields.Float('Booked Hours', readonly=True, aggregator='sum')
+    revenue = fields.Float('Revenue', digits='Product Price', readonly=True, aggregator='sum')
+
+    def init(self):
+        create_index(self._cr, 'dental_clinic_kpi_day_doctor_status_index', self._table,
+                     ['day', 'doctor_id', 'appointment_status'])
+
+    @api.model
+    def _refresh_kpis(self):
+        """Recompute the rows of the days touched since the previous refresh:
+        days of the appointments (or of their procedure lines) changed since
+        the watermark, and days appointments were moved away from or deleted
+        from, queued in dental.clinic.kpi.dirty. The first refresh builds the
+        whole table."""
+        Watermark = self.env['dental.clinic.watermark']
+        self.env.flush_all()
+        self.env.cr.execute("SELECT now() AT TIME ZONE 'UTC'")
+        now = self.env.cr.fetchone()[0]
+        watermark = Watermark._get_watermark(KPI_WATERMARK)
+        self.env.cr.execute("DELETE FROM dental_clinic_kpi_dirty RETURNING day")
+        days = {row[0] for row in self.env.cr.fetchall()}
+        if watermark:
+            # Rows committed late with an older write_date are caught by the overlap.
+            since = watermark - timedelta(seconds=SYNC_SETTLE_SECONDS)
+            self.env.cr.execute("""
+                SELECT start::date FROM patient_appointment WHERE write_date > %s
+                 UNION
+                SELECT a.start::date FROM appointment_dental_procedure_line l
+                  JOIN patient_appointment a ON a.id = l.appointment_id
+                 WHERE l.write_date > %s
+            """, (since, since))
+        else:
+            self.env.cr.execute("SELECT DISTINCT start::date FROM patient_appointment")
+        days.update(row[0] for row in self.env.cr.fetchall() if row[0])
+        days = sorted(days)
+        if days:
+            self.env.cr.execute("DELETE FROM dental_clinic_kpi WHERE day = ANY(%s::date[])", [days])
+            self.env.cr.execute("""
+                INSERT INTO dental_clinic_kpi
+                       (day, doctor_id, appointment_status, appointment_count, booked_hours, revenue)
+            """ + KPI_AGGREGATE_QUERY, [days])
+            self.invalidate_model()
+        Watermark._set_watermark(KPI_WATERMARK, now)
+        _logger.info("Refreshed clinic KPIs of %s days", len(days))
+        self.env['ir.cron']._notify_progress(done=len(days), remaining=0)
+        return len(days)
+
+    @api.model
+    def get_dashboard(self, date_from, date_to, doctor_ids=None):
+        """Dashboard figures between ``date_from`` and ``date_to`` (included),
+        read from the materialized rows: per day and doctor, and per doctor with
+        completion and cancellation rates."""
+        domain = [('day', '>=', date_from), ('day', '<=', date_to)]
+        if doctor_ids:
+            domain.append(('doctor_id', 'in', doctor_ids))
+        daily = [
+            {
+                'day': fields.Date.to_string(day),
+                'doctor_id': doctor.id or False,
+                'appointment_count': count,
+                'booked_hours': hours,
+                'revenue': revenue,
+            }
+            for day, doctor, count, hours, revenue in self._read_group(
+                domain, ['day:day', 'doctor_id'], ['appointment_count:sum', 'booked_hours:sum', 'revenue:sum'])
+        ]
+        totals = {}
+        for doctor, status, count, revenue in self._read_group(
+                domain, ['doctor_id', 'appointment_status'], ['appointment_count:sum', 'revenue:sum']):
+            total = totals.setdefault(doctor.id or False, {
+                'doctor_id': doctor.id or False,
+                'doctor_name': doctor.doctor_name if doctor else False,
+                'appointment_count': 0,
+                'by_status': {},
+                'revenue': 0.0,
+            })
+            total['appointment_count'] += count
+            total['by_status'][status or 'draft'] = count
+            total['revenue'] += revenue
+        for total in totals.values():
+            count = total['appointment_count']
+            total['completion_rate'] = round(total['by_status'].get('completed_appointment', 0) / count, 4) if count else 0.0
+            total['cancellation_rate'] = round(total['by_status'].get('cancelled', 0) / count, 4) if count else 0.0
+        return {'daily': daily, 'doctors': list(totals.values())}
+
+
+class ClinicKpiDirtyDay(models.Model):
+    """Day whose KPI rows lost an appointment (moved or deleted) since the last
+    refresh: the watermark of _refresh_kpis() only sees where appointments are
+    now, not where they were."""
+    _name = 'dental.clinic.kpi.dirty'
+    _description = 'Clinic KPI Day To Refresh'
+    _log_access = False
+
+    day = fields.Date('Day', required=True)
+
+    @api.model
+    def _mark_appointments(self, appointments):
+        days = {start.date() for start in appointments.mapped('start') if start}
+        if days:
+            self.env.cr.execute(
+                "INSERT INTO dental_clinic_kpi_dirty (day) SELECT unnest(%s::date[])", [sorted(days)])
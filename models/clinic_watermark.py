@@ -0,0 +1,32 @@
+from odoo import api, fields, models
+
+
+class ClinicWatermark(models.Model):
+    """Point a scheduled action has processed up to, one row per action.
+
+    Read and moved with plain SQL rather than kept in ir.config_parameter,
+    whose write() clears the ormcache of every worker."""
+    _name = 'dental.clinic.watermark'
+    _description = 'Clinic Scheduled Action Watermark'
+    _log_access = False
+    _sql_constraints = [
+        ('name_unique', 'unique(name)', 'There is one watermark per scheduled action.')
+    ]
+
+    name = fields.Char('Name', required=True, readonly=True)
+    watermark = fields.Datetime('Processed Until', readonly=True)
+
+    @api.model
+    def _get_watermark(self, name):
+        """Watermark ``name`` as a naive UTC datetime, None when not set yet."""
+        self.env.cr.execute("SELECT watermark FROM dental_clinic_watermark WHERE name = %s", [name])
+        row = self.env.cr.fetchone()
+        return row[0] if row else None
+
+    @api.model
+    def _set_watermark(self, name, value):
+        self.env.cr.execute("""
+            INSERT INTO dental_clinic_watermark (name, watermark) VALUES (%s, %s)
+            ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark
+        """, [name, value])
+        self.invalidate_model(['watermark'])
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools.sql import SQL, create_index
+
+# Models synced by /api/sync, in the order of the watermarks in a sync cursor.
+SYNC_MODELS = (
+    "patient.patient",
+    "patient.appointment",
+    "appointment.dental.procedure.line",
+    "patient.prescription",
+)
+# write_date is the start time of the writing transaction, which may commit
+# later than a sync reading past it. Watermarks never move past now() minus
+# this margin, so such rows are picked up (again) by the next sync.
+SYNC_SETTLE_SECONDS = 30
+TOMBSTONE_RETENTION_DAYS = 90
+
+
+class SyncTombstone(models.Model):
+    _name = "dental.sync.tombstone"
+    _description = "Deleted Record Marker for Delta Sync"
+    _order = "write_date, id"
+
+    res_model = fields.Char("Model", required=True)
+    res_id = fields.Integer("Record ID", required=True)
+
+    def init(self):
+        create_index(self._cr, 'dental_sync_tombstone_write_date_id_index', self._table, ['write_date', 'id'])
+
+    @api.model
+    def _record_deletion(self, records):
+        if records:
+            self.sudo().create([{"res_model": records._name, "res_id": res_id} for res_id in records.ids])
+
+    @api.model
+    def _gc_tombstones(self, days=TOMBSTONE_RETENTION_DAYS):
+        """Forget deletions older than ``days``; clients that did not sync since
+        then get asked for a full resync."""
+        self.env.cr.execute(
+            "DELETE FROM dental_sync_tombstone WHERE write_date < (now() AT TIME ZONE 'UTC') - %s",
+            (timedelta(days=days),),
+        )
+        self.invalidate_model()
+        return self.env.cr.rowcount
+
+
+class DeltaSync(models.AbstractModel):
+    _name = "dental.sync"
+    _description = "Dental Clinic Delta Sync"
+
+    @api.model
+    def _changed_since(self, model_name, watermark, limit):
+        """Records of ``model_name`` written after the ``(write_date, id)``
+        watermark, in that order, and the watermark of the last one."""
+        Model = self.env[model_name].with_context(active_test=False)
+        query = Model._search([], limit=limit, order="write_date, id")
+        if watermark:
+            query.add_where(SQL(
+                "(%s, %s) > (%s, %s)",
+                SQL.identifier(Model._table, 'write_date'), SQL.identifier(Model._table, 'id'),
+                watermark[0], watermark[1],
+            ))
+        records = Model.browse(query)
+        last = None
+        if records:
+            # Raw column: the ORM drops the microseconds the watermark compares on.
+            self.env.cr.execute(
+                SQL("SELECT write_date, id FROM %s WHERE id = %s", SQL.identifier(Model._table), records[-1].id))
+            last = self.env.cr.fetchone()
+        return records, last
+
+    @api.model
+    def get_changes(self, watermarks=None, limit=500, fields_by_model=None):
+        """Changes since ``watermarks``, a list with one ``(write_date, id)`` pair
+        (or None) per SYNC_MODELS entry followed by one for the tombstones.
+
+        Returns ``(changes, deleted, watermarks, has_more)``: the changed rows per
+        model, the ``{"model", "id"}`` of deleted records, the watermarks to send
+        next time and whether a model still had more than ``limit`` changes.
+        The watermark of a model that is caught up moves to now() minus
+        SYNC_SETTLE_SECONDS, whether or not it changed. Returns None when the oldest watermark is older than the tombstone
+        retention, the client then has to resync from scratch.
+        """
+        watermarks = list(watermarks or [None] * (len(SYNC_MODELS) + 1))
+        self.env.cr.execute("SELECT now() AT TIME ZONE 'UTC'")
+        now = self.env.cr.fetchone()[0]
+        settled = (now - timedelta(seconds=SYNC_SETTLE_SECONDS), 0)
+        horizon = now - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+        if any(watermark and watermark[0] < horizon for watermark in watermarks):
+            return None
+
+        fields_by_model = fields_by_model or {}
+        changes = {}
+        has_more = False
+        next_watermarks = []
+        for model_name, watermark in zip(SYNC_MODELS + ("dental.sync.tombstone",), watermarks):
+            records, last = self._changed_since(model_name, watermark, limit)
+            more = len(records) == limit
+            has_more = has_more or more
+            if more:
+                next_watermarks.append(last)
+            else:
+                # Caught up: move to the settled point even when nothing changed,
+                # else the watermark of a quiet model (the tombstones above all)
+                # falls out of the retention and forces a full resync.
+                next_watermarks.append(max(tuple(watermark), settled) if watermark else settled)
+            if model_name == "dental.sync.tombstone":
+                deleted = [{"model": record.res_model, "id": record.res_id} for record in records.sudo()]
+            else:
+                changes[model_name] = records.read(fields_by_model.get(model_name))
+        return changes, deleted, next_watermarks, has_more
@@ -0,0 +1,122 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+IDEMPOTENCY_TTL_HOURS = 24
+IDEMPOTENCY_CACHE_SIZE = 2048
+
+
+class ResponseCache(object):
+    """Thread-safe LRU of (user id, key) -> stored response, local to the worker
+    process; entries expire with their key."""
+
+    def __init__(self, size=IDEMPOTENCY_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, cache_key):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            if time.time() >= entry[0]:
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry[1]
+
+    def put(self, cache_key, stored, expires_at):
+        with self._lock:
+            self._entries[cache_key] = (expires_at, stored)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+class APIIdempotencyKey(models.Model):
+    """Response of a create request sent with an Idempotency-Key header, kept
+    so that a retry of the request is answered without creating again."""
+    _name = "api.idempotency.key"
+    _description = "API Idempotency Key"
+    _sql_constraints = [
+        ('user_key_unique', 'unique(user_id, key)', 'An idempotency key can only be used once per user.')
+    ]
+
+    key = fields.Char("Idempotency Key", size=255, required=True)
+    user_id = fields.Many2one("res.users", string="User", required=True, ondelete='cascade')
+    endpoint = fields.Char("Endpoint", required=True)
+    request_hash = fields.Char("Request Hash", size=64, required=True)
+    status = fields.Integer("Response Status")
+    content_type = fields.Char("Response Content Type")
+    body = fields.Text("Response Body")
+    expiry_date = fields.Datetime("Expiry Date", required=True, index=True)
+
+    @api.model
+    def _claim(self, user_id, key, endpoint, request_hash):
+        """Reserve ``key`` for a request about to run. Returns None when the key
+        is ours, otherwise the stored response of the first request, as a dict
+        with ``request_hash``, ``status``, ``content_type`` and ``body``, whose
+        body is None if that request failed and released the key.
+
+        A concurrent request holding the same key makes this wait on the unique
+        index until that request's transaction is over.
+        """
+        cache_key = (self.env.cr.dbname, user_id, key)
+        stored = response_cache.get(cache_key)
+        if stored is not None:
+            return stored
+        self.env.cr.execute("""
+            INSERT INTO api_idempotency_key
+                   (key, user_id, endpoint, request_hash, expiry_date, create_uid, write_uid, create_date, write_date)
+            VALUES (%s, %s, %s, %s, (now() AT TIME ZONE 'UTC') + %s, %s, %s, now() AT TIME ZONE 'UTC', now() AT TIME ZONE 'UTC')
+            ON CONFLICT (user_id, key) DO NOTHING
+            RETURNING id
+        """, (key, user_id, endpoint, request_hash, timedelta(hours=IDEMPOTENCY_TTL_HOURS), user_id, user_id))
+        if self.env.cr.fetchone():
+            return None
+        self.env.cr.execute("""
+            SELECT request_hash, status, content_type, body, expiry_date
+              FROM api_idempotency_key WHERE user_id = %s AND key = %s
+        """, (user_id, key))
+        request_hash_, status, content_type, body, expiry_date = self.env.cr.fetchone()
+        stored = {"request_hash": request_hash_, "status": status, "content_type": content_type, "body": body}
+        if body is not None:
+            response_cache.put(cache_key, stored, time.time() + (expiry_date - fields.Datetime.now()).total_seconds())
+        return stored
+
+    @api.model
+    def _store(self, user_id, key, status, content_type, body):
+        self.env.cr.execute("""
+            UPDATE api_idempotency_key SET status = %s, content_type = %s, body = %s
+             WHERE user_id = %s AND key = %s
+         RETURNING request_hash
+        """, (status, content_type, body, user_id, key))
+        row = self.env.cr.fetchone()
+        if row:
+            # Only once committed: a request rolled back (or retried by Odoo after
+            # a serialization failure) must not be replayed from the cache.
+            self.env.cr.postcommit.add(functools.partial(
+                response_cache.put,
+                (self.env.cr.dbname, user_id, key),
+                {"request_hash": row[0], "status": status, "content_type": content_type, "body": body},
+                time.time() + IDEMPOTENCY_TTL_HOURS * 3600,
+            ))
+
+    @api.model
+    def _release(self, user_id, key):
+        """Forget ``key`` after a failed request, so that a retry runs again."""
+        self.env.cr.execute("DELETE FROM api_idempotency_key WHERE user_id = %s AND key = %s", (user_id, key))
+
+    @api.model
+    def _gc_idempotency_keys(self):
+        self.env.cr.execute("DELETE FROM api_idempotency_key WHERE expiry_date < (now() AT TIME ZONE 'UTC')")
+        self.invalidate_model()
+        return self.env.cr.rowcount
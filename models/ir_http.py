@@ -0,0 +1,22 @@
+from odoo import models
+from odoo.http import request
+
+from ..controllers.common import compress_response
+
+# Prefix of the routes of controllers/main.py and controllers/login.py.
+API_PREFIX = "/api/"
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = "ir.http"
+
+    @classmethod
+    def _post_dispatch(cls, response):
+        super()._post_dispatch(response)
+        # type="json" routes cannot build their own response: compress the
+        # JSON-RPC envelope of the API listings here, once Odoo has built it.
+        if (request.httprequest.path.startswith(API_PREFIX)
+                and request.dispatcher.routing_type == "json"
+                and not response.direct_passthrough
+                and "Content-Encoding" not in response.headers):
+            compress_response(response)
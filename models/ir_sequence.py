@@ -0,0 +1,114 @@
+import threading
+from collections import deque
+
+from odoo import api, models, _
+from odoo.exceptions import UserError
+
+CLINIC_SEQUENCE_CODES = (
+    "patient.sequence",
+    "patient.appointment.sequence",
+    "patient.appointment.prescription.sequence",
+)
+
+# How clinic serials are allocated:
+#  - no_gap:   the ir.sequence row is locked until the creating transaction ends,
+#              so concurrent bookings queue behind each other (gapless serials);
+#  - standard: PostgreSQL sequences, no lock, numbers of rolled back
+#              transactions are lost;
+#  - block:    on standard sequences too, each worker reserves
+#              SERIAL_BLOCK_SIZE_PARAM numbers at a time and hands them out
+#              locally; numbers still reserved when the worker stops are lost.
+SERIAL_MODES = ("no_gap", "standard", "block")
+SERIAL_MODE_PARAM = "dental_clinic.serial_allocation_mode"
+SERIAL_BLOCK_SIZE_PARAM = "dental_clinic.serial_block_size"
+DEFAULT_SERIAL_BLOCK_SIZE = 50
+
+# (dbname, sequence id) -> numbers reserved by this worker and not handed out yet
+_serial_blocks = {}
+_serial_blocks_lock = threading.Lock()
+
+
+class IrSequence(models.Model):
+    _inherit = "ir.sequence"
+
+    @api.model
+    def next_batch_by_code(self, sequence_code, count):
+        """Like ``next_by_code`` but returns ``count`` consecutive values, reserved
+        with a single statement on the sequence instead of one per record."""
+        if count <= 0:
+            return []
+        self.check_access("read")
+        company_id = self.env.company.id
+        seq_ids = self.search(
+            [("code", "=", sequence_code), ("company_id", "in", [company_id, False])], order="company_id"
+        )
+        if not seq_ids:
+            return [False] * count
+        seq = seq_ids[0]
+        if seq.use_date_range:
+            # Date range sub-sequences keep their own counters, go through the standard path.
+            return [seq._next() for _i in range(count)]
+        return [seq.get_next_char(number) for number in seq._reserve_numbers(count)]
+
+    @api.model
+    def next_clinic_serials(self, sequence_code, count):
+        """Return ``count`` serials for ``sequence_code`` following the configured
+        allocation mode, see SERIAL_MODES."""
+        if count <= 0:
+            return []
+        mode = self.env["ir.config_parameter"].sudo().get_param(SERIAL_MODE_PARAM, "no_gap")
+        if mode != "block":
+            return self.next_batch_by_code(sequence_code, count)
+        seq = self.sudo().search(
+            [("code", "=", sequence_code), ("company_id", "in", [self.env.company.id, False])],
+            order="company_id", limit=1,
+        )
+        if not seq or seq.use_date_range:
+            return self.next_batch_by_code(sequence_code, count)
+        return [seq.get_next_char(number) for number in seq._take_block_numbers(count)]
+
+    @api.model
+    def set_clinic_serial_mode(self, mode):
+        """Switch the clinic sequences to allocation ``mode``."""
+        if mode not in SERIAL_MODES:
+            raise UserError(_("Unknown serial allocation mode %s, expected one of %s.", mode, ", ".join(SERIAL_MODES)))
+        self.env["ir.config_parameter"].sudo().set_param(SERIAL_MODE_PARAM, mode)
+        sequences = self.sudo().search([("code", "in", CLINIC_SEQUENCE_CODES)])
+        sequences.write({"implementation": "no_gap" if mode == "no_gap" else "standard"})
+        with _serial_blocks_lock:
+            _serial_blocks.clear()
+
+    def _take_block_numbers(self, count):
+        self.ensure_one()
+        block_size = int(self.env["ir.config_parameter"].sudo().get_param(
+            SERIAL_BLOCK_SIZE_PARAM, DEFAULT_SERIAL_BLOCK_SIZE))
+        with _serial_blocks_lock:
+            block = _serial_blocks.setdefault((self._cr.dbname, self.id), deque())
+            if len(block) < count:
+                size = max(block_size, count - len(block))
+                if self.implementation == "standard":
+                    # nextval takes no lock and is not undone by a rollback.
+                    block.extend(self._reserve_numbers(size))
+                else:
+                    # A no_gap sequence (the mode parameter set by hand): commit the
+                    # reservation on its own, else a rolled back booking would put
+                    # back numbers this worker keeps handing out.
+                    with self.pool.cursor() as cr:
+                        block.extend(self.with_env(self.env(cr=cr))._reserve_numbers(size))
+            return [block.popleft() for _i in range(count)]
+
+    def _reserve_numbers(self, count):
+        self.ensure_one()
+        if self.implementation == "standard":
+            self._cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)", ("ir_sequence_%03d" % self.id, count)
+            )
+            return [row[0] for row in self._cr.fetchall()]
+        self._cr.execute("SELECT number_next FROM ir_sequence WHERE id=%s FOR UPDATE NOWAIT", [self.id])
+        number_next = self._cr.fetchone()[0]
+        self._cr.execute(
+            "UPDATE ir_sequence SET number_next=number_next+%s WHERE id=%s",
+            (self.number_increment * count, self.id),
+        )
+        self.invalidate_recordset(["number_next"])
+        return [number_next + i * self.number_increment for i in range(count)]
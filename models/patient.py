@@ -1,11 +1,26 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError, UserError
-from datetime import date
+from odoo.tools.sql import SQL, create_index
+from calendar import isleap
+from collections import defaultdict
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+
+from .appointment_dental_procedure_line import teeth_to_mask, mask_to_teeth
+from .patient_appointment import tooth_mask_domain
+
+AGE_WATERMARK = 'patient_age'
+
+
+def age_label(date_of_birth, today):
+    if not date_of_birth:
+        return ""
+    return f"{relativedelta(today, date_of_birth).years} Years Old"
 
 
 class Patient(models.Model):
     _name = "patient.patient"
-    _inherit = ['mail.thread']
+    _inherit = ['mail.thread', 'dental.bulk.mixin']
     _rec_name = "patient_name"
 
     patient_serial = fields.Char(
@@ -61,21 +76,197 @@ class Patient(models.Model):
 
     patient_prescriptions = fields.One2many('patient.prescription', 'patient_id', string="Prescriptions")
 
+    # Union of the tooth masks of the patient's appointments.
+    tooth_mask = fields.Integer('Tooth Mask', compute='_compute_tooth_mask', store=True, readonly=True)
+    treated_tooth = fields.Integer(
+        'Treated Tooth', compute='_compute_treated_tooth', search='_search_treated_tooth',
+        help="Search only: patients with a procedure on this tooth number (1-32), or on any of a list"
+    )
+
+    @api.depends('appointment_id.tooth_mask')
+    def _compute_tooth_mask(self):
+        for rec in self:
+            teeth = set()
+            for appointment in rec.appointment_id:
+                teeth.update(mask_to_teeth(appointment.tooth_mask))
+            rec.tooth_mask = teeth_to_mask(teeth)
+
+    def _compute_treated_tooth(self):
+        self.treated_tooth = 0
+
+    def _search_treated_tooth(self, operator, value):
+        return tooth_mask_domain(self, operator, value)
+
+    @api.model
+    def search_by_treated_teeth(self, teeth, date_from=None, date_to=None):
+        """Patients with a procedure on any of ``teeth`` (1-32), optionally only
+        counting appointments starting within ``date_from``/``date_to``."""
+        if not date_from and not date_to:
+            return self.search([('treated_tooth', 'in', list(teeth))])
+        appointment_domain = [('treated_tooth', 'in', list(teeth))]
+        if date_from:
+            appointment_domain.append(('start', '>=', date_from))
+        if date_to:
+            appointment_domain.append(('start', '<=', date_to))
+        return self.search([('appointment_id', 'any', appointment_domain)])
+
     @api.depends('date_of_birth')
     def compute_age(self):
+        # Whole years, changing on the birthday itself (Feb 28 for Feb 29 births
+        # in common years), which is what the nightly recompute relies on.
+        today = date.today()
         for rec in self:
-            if rec.date_of_birth:
-                age = date.today() - rec.date_of_birth
-                age_in_years = int(age.days // 365.2425)
-                rec.age = f"{age_in_years} Years Old"
-            else:
-                rec.age = ""
+            rec.age = age_label(rec.date_of_birth, today)
 
     @api.model
-    def create(self, vals):
-        if vals.get('patient_serial', _('New Patient')) == _('New Patient'):
-            vals['patient_serial'] = self.env['ir.sequence'].next_by_code('patient.sequence') or _('New Patient')
-        return super(Patient, self).create(vals)
+    def _cron_recompute_ages(self):
+        """Bring the stored ``age`` up to date. Only the patients whose birthday
+        fell since the previous run can have aged: they are found through the
+        (month, day) index and written with one UPDATE per age value. The first
+        run, or one after more than a year, recomputes every patient."""
+        Watermark = self.env['dental.clinic.watermark']
+        today = date.today()
+        last_run = Watermark._get_watermark(AGE_WATERMARK)
+        last_run = last_run and last_run.date()
+        if last_run and last_run >= today:
+            return
+        self.flush_model(['date_of_birth', 'age'])
+        if last_run and (today - last_run).days <= 366:
+            days = [last_run + timedelta(days=offset) for offset in range(1, (today - last_run).days + 1)]
+            month_days = {(day.month, day.day) for day in days}
+            # Feb 29 births turn a year older on Feb 28 in common years.
+            if any(day.month == 2 and day.day == 28 and not isleap(day.year) for day in days):
+                month_days.add((2, 29))
+            self.env.cr.execute("""
+                SELECT id, date_of_birth FROM patient_patient
+                 WHERE (EXTRACT(MONTH FROM date_of_birth), EXTRACT(DAY FROM date_of_birth)) IN %s
+            """, [tuple(month_days)])
+        else:
+            self.env.cr.execute("SELECT id, date_of_birth FROM patient_patient WHERE date_of_birth IS NOT NULL")
+        ids_by_age = defaultdict(list)
+        for patient_id, date_of_birth in self.env.cr.fetchall():
+            ids_by_age[age_label(date_of_birth, today)].append(patient_id)
+        for age, ids in ids_by_age.items():
+            self.env.cr.execute("""
+                UPDATE patient_patient
+                   SET age = %s, write_date = (now() AT TIME ZONE 'UTC'), write_uid = %s
+                 WHERE id IN %s AND age IS DISTINCT FROM %s
+            """, (age, self.env.uid, tuple(ids), age))
+        self.invalidate_model(['age', 'write_date', 'write_uid'])
+        Watermark._set_watermark(AGE_WATERMARK, today)
+        self.env['ir.cron']._notify_progress(done=sum(len(ids) for ids in ids_by_age.values()), remaining=0)
+
+    def init(self):
+        # Supports keyset pagination on (create_date, id), see search_keyset().
+        create_index(self._cr, 'patient_patient_create_date_id_index', self._table, ['create_date', 'id'])
+        # Delta sync watermarks.
+        create_index(self._cr, 'patient_patient_write_date_id_index', self._table, ['write_date', 'id'])
+        # Birthdays of the day, see _cron_recompute_ages().
+        create_index(self._cr, 'patient_patient_birthday_index', self._table, [
+            'EXTRACT(MONTH FROM date_of_birth)', 'EXTRACT(DAY FROM date_of_birth)',
+        ])
+
+    @api.model
+    def search_keyset(self, domain, cursor=None, limit=100):
+        """Return ``(records, next_cursor)`` for the page following ``cursor``.
+
+        Records are ordered by ``create_date desc, id desc``; ``cursor`` is the
+        ``(create_date, id)`` pair of the last record of the previous page, as
+        returned by this method, and ``next_cursor`` is None on the last page.
+        """
+        query = self._search(domain, limit=limit, order="create_date desc, id desc")
+        if cursor:
+            query.add_where(SQL(
+                "(%s, %s) < (%s, %s)",
+                SQL.identifier(self._table, 'create_date'), SQL.identifier(self._table, 'id'),
+                cursor[0], cursor[1],
+            ))
+        records = self.browse(query)
+        next_cursor = None
+        if limit and len(records) == limit:
+            # Read the raw column: the ORM drops the microseconds the index sorts on.
+            self._cr.execute("SELECT create_date, id FROM patient_patient WHERE id = %s", (records[-1].id,))
+            next_cursor = self._cr.fetchone()
+        return records, next_cursor
+
+    def get_timeline(self, limit=20, cursor=None, fields_by_model=None):
+        """Nested history of the patient: a page of appointments, newest first,
+        each with its procedure lines and its prescriptions and their lines.
+
+        Whatever the number of appointments, this is one read per model. ``cursor``
+        is the ``(start, id)`` of the last appointment of the previous page, as
+        returned in ``next_cursor``; ``fields_by_model`` maps model names to the
+        fields to read for them.
+        """
+        self.ensure_one()
+        fields_by_model = fields_by_model or {}
+
+        def read(records, model_name, link_field=None):
+            field_names = fields_by_model.get(model_name)
+            if field_names and link_field and link_field not in field_names:
+                field_names = list(field_names) + [link_field]
+            return records.read(field_names)
+
+        def group_by_link(rows, link_field):
+            groups = {}
+            for row in rows:
+                if row[link_field]:
+                    groups.setdefault(row[link_field][0], []).append(row)
+            return groups
+
+        domain = [('patient_id', '=', self.id)]
+        if cursor:
+            start, record_id = cursor
+            domain += ['|', ('start', '<', start), '&', ('start', '=', start), ('id', '<', record_id)]
+        appointments = self.env['patient.appointment'].search(domain, order='start desc, id desc', limit=limit)
+        prescriptions = appointments.patient_appointment_prescription_id
+
+        appointment_rows = read(appointments, 'patient.appointment')
+        lines = group_by_link(
+            read(appointments.procedure_line_id, 'appointment.dental.procedure.line', 'appointment_id'),
+            'appointment_id')
+        prescription_lines = group_by_link(
+            read(prescriptions.prescription_line_id, 'patient.prescription.line', 'prescription_id'),
+            'prescription_id')
+        prescription_rows = read(prescriptions, 'patient.prescription', 'appointment_id')
+        for row in prescription_rows:
+            row['lines'] = prescription_lines.get(row['id'], [])
+        prescriptions_by_appointment = group_by_link(prescription_rows, 'appointment_id')
+        for row in appointment_rows:
+            row['procedure_lines'] = lines.get(row['id'], [])
+            row['prescriptions'] = prescriptions_by_appointment.get(row['id'], [])
+
+        next_cursor = None
+        if limit and len(appointments) == limit:
+            next_cursor = (appointments[-1].start, appointments[-1].id)
+        return {
+            'patient': read(self, 'patient.patient')[0],
+            'appointments': appointment_rows,
+            'next_cursor': next_cursor,
+        }
+
+    def unlink(self):
+        self.env['dental.sync.tombstone']._record_deletion(self)
+        # The database sets patient_id to NULL on the appointments and their
+        # prescriptions: touch them so delta sync clients see the change.
+        if self.ids:
+            self.env.flush_all()
+            for table in ('patient_appointment', 'patient_prescription'):
+                self.env.cr.execute(SQL(
+                    "UPDATE %s SET write_date = (now() AT TIME ZONE 'UTC'), write_uid = %s WHERE patient_id IN %s",
+                    SQL.identifier(table), self.env.uid, tuple(self.ids),
+                ))
+            self.env['patient.appointment'].invalidate_model(['write_date', 'write_uid'])
+            self.env['patient.prescription'].invalidate_model(['write_date', 'write_uid'])
+        return super(Patient, self).unlink()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        pending = [vals for vals in vals_list if vals.get('patient_serial', _('New Patient')) == _('New Patient')]
+        serials = self.env['ir.sequence'].next_clinic_serials('patient.sequence', len(pending))
+        for vals, serial in zip(pending, serials):
+            vals['patient_serial'] = serial or _('New Patient')
+        return super(Patient, self).create(vals_list)
 
     _sql_constraints = [
         ('unique_patient_name_dob',
@@ -1,10 +1,39 @@
-from odoo import api, fields, models, _
-from odoo.exceptions import ValidationError
+from odoo import api, fields, models, Command, _
+from odoo.exceptions import ValidationError, UserError
+from odoo.tools.sql import SQL, create_index
+from collections import defaultdict
 from datetime import timedelta
 
+from .appointment_dental_procedure_line import teeth_to_mask, mask_to_teeth
+from .clinic_kpi import KPI_FIELDS
+
+DEFAULT_PROCEDURE_PARAM = 'dental_clinic.default_procedure_product_id'
+
+# Transition name: (statuses it applies to, status it leads to).
+APPOINTMENT_TRANSITIONS = {
+    'confirm': (('draft',), 'confirm'),
+    'start_exam': (('confirm',), 'in_exam'),
+    'complete_exam': (('in_exam',), 'completed_exam'),
+    'complete': (('confirm', 'in_exam', 'completed_exam'), 'completed_appointment'),
+    'cancel': (('draft', 'confirm'), 'cancelled'),
+    'reset_to_draft': (('cancelled',), 'draft'),
+}
+
+
+def tooth_mask_domain(model, operator, value):
+    """Domain matching the records of ``model`` whose ``tooth_mask`` has any of
+    the given teeth; the mask test runs in SQL on the record's own row."""
+    if operator not in ('=', 'in'):
+        raise UserError(_("Treated tooth can only be searched with '=' or 'in'."))
+    mask = teeth_to_mask(value if operator == 'in' else [value])
+    query = model._search([])
+    query.add_where(SQL("%s & %s != 0", SQL.identifier(model._table, 'tooth_mask'), mask))
+    return [('id', 'in', query)]
+
+
 class PatientAppointment(models.Model):
     _name = "patient.appointment"
-    _inherit = ["mail.thread"]
+    _inherit = ["mail.thread", "dental.bulk.mixin"]
     _rec_name = "appointment_serial"
     _description = "Patient Clinic Appointment"
 
@@ -62,6 +91,24 @@ class PatientAppointment(models.Model):
 
     user_id = fields.Many2one('res.users', string='Assistant Name', default=lambda self: self.env.user)
 
+    # Bit n-1 is set when a procedure line is recorded on Tooth<n>, see tooth_bit().
+    tooth_mask = fields.Integer('Tooth Mask', compute='_compute_tooth_mask', store=True, readonly=True)
+    treated_tooth = fields.Integer(
+        'Treated Tooth', compute='_compute_treated_tooth', search='_search_treated_tooth',
+        help="Search only: appointments with a procedure on this tooth number (1-32), or on any of a list"
+    )
+
+    @api.depends('procedure_line_id.tooth_no')
+    def _compute_tooth_mask(self):
+        for record in self:
+            record.tooth_mask = teeth_to_mask(record.procedure_line_id.filtered('tooth_no').mapped('tooth_no'))
+
+    def _compute_treated_tooth(self):
+        self.treated_tooth = 0
+
+    def _search_treated_tooth(self, operator, value):
+        return tooth_mask_domain(self, operator, value)
+
     @api.depends('start', 'duration')
     def _compute_stop(self):
         for record in self:
@@ -88,8 +135,157 @@ class PatientAppointment(models.Model):
             if record.stop and record.start and record.stop < record.start:
                 raise ValidationError(_("End time cannot be earlier than start time."))
 
+    @api.constrains('doctor_id', 'start', 'stop', 'appointment_status')
+    def _check_doctor_availability(self):
+        booked = self.filtered(lambda a: a.doctor_id and a.start and a.stop and a.appointment_status != 'cancelled')
+        if not booked:
+            return
+        self.flush_model(['doctor_id', 'start', 'stop', 'appointment_status'])
+        # Serialize bookings per doctor so two transactions cannot both pass the check.
+        self.env.cr.execute(
+            "SELECT id FROM clinic_doctor WHERE id IN %s FOR NO KEY UPDATE",
+            [tuple(booked.doctor_id.ids)],
+        )
+        # One query for the whole batch; b.start < a.stop bounds the scan of the
+        # (doctor_id, start, stop) index, the range test does the overlap.
+        self.env.cr.execute("""
+            SELECT a.id, b.appointment_serial
+              FROM patient_appointment a
+              JOIN patient_appointment b
+                ON b.doctor_id = a.doctor_id AND b.id != a.id AND b.start < a.stop
+               AND tsrange(b.start, b.stop) && tsrange(a.start, a.stop)
+               AND b.appointment_status IS DISTINCT FROM 'cancelled'
+             WHERE a.id IN %s
+             ORDER BY a.id, b.start
+             LIMIT 1
+        """, [tuple(booked.ids)])
+        clash = self.env.cr.fetchone()
+        if clash:
+            record = self.browse(clash[0])
+            raise ValidationError(_("%(doctor)s already has appointment %(serial)s at that time.",
+                                    doctor=record.doctor_id.doctor_name, serial=clash[1]))
+
+    def init(self):
+        # Serves the overlap check above and clinic.doctor.search_free_slots().
+        create_index(self._cr, 'patient_appointment_doctor_start_stop_index', self._table, ['doctor_id', 'start', 'stop'])
+        # Clinical audits: treated_tooth searches over a date range, answered from the index.
+        create_index(self._cr, 'patient_appointment_start_tooth_mask_index', self._table, ['start', 'tooth_mask'])
+        # Delta sync watermarks.
+        create_index(self._cr, 'patient_appointment_write_date_id_index', self._table, ['write_date', 'id'])
+
+    def write(self, vals):
+        if not KPI_FIELDS.isdisjoint(vals):
+            # The KPI rows of the days the appointments leave need a refresh too.
+            self.env['dental.clinic.kpi.dirty']._mark_appointments(self)
+        return super(PatientAppointment, self).write(vals)
+
+    def unlink(self):
+        self.env['dental.clinic.kpi.dirty']._mark_appointments(self)
+        # Procedure lines go with the appointment through the database cascade.
+        self.env['dental.sync.tombstone']._record_deletion(self.procedure_line_id)
+        self.env['dental.sync.tombstone']._record_deletion(self)
+        return super(PatientAppointment, self).unlink()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        pending = [vals for vals in vals_list if vals.get('appointment_serial', _('New Appointment')) == _('New Appointment')]
+        serials = self.env['ir.sequence'].next_clinic_serials('patient.appointment.sequence', len(pending))
+        for vals, serial in zip(pending, serials):
+            vals['appointment_serial'] = serial or _('New Appointment')
+        return super(PatientAppointment, self).create(vals_list)
+
     @api.model
-    def create(self, vals):
-        if vals.get('appointment_serial', _('New Appointment')) == _('New Appointment'):
-            vals['appointment_serial'] = self.env['ir.sequence'].next_by_code('patient.appointment.sequence') or _('New Appointment')
-        return super(PatientAppointment, self).create(vals)
+    def _find_transition(self, from_status, to_status):
+        """Name of the transition leading from ``from_status`` to ``to_status``, or None."""
+        for name, (sources, target) in APPOINTMENT_TRANSITIONS.items():
+            if target == to_status and from_status in sources:
+                return name
+        return None
+
+    @api.model
+    def apply_transitions(self, moves):
+        """Move appointments through the transitions of APPOINTMENT_TRANSITIONS.
+
+        ``moves`` maps appointment ids to transition names. Moves that are not
+        allowed from the current status of their appointment are left out and
+        reported; the others are written with one ``write`` per target status.
+        Returns ``{'done': {id: new status}, 'errors': [{'id', 'message'}]}``.
+        """
+        moves = {int(appointment_id): name for appointment_id, name in moves.items()}
+        done, errors = {}, []
+        if not moves:
+            return {'done': done, 'errors': errors}
+        self.flush_model(['appointment_status'])
+        # Lock the rows so a concurrent transition cannot act on a stale status.
+        self.env.cr.execute(
+            "SELECT id, appointment_status FROM patient_appointment WHERE id IN %s FOR NO KEY UPDATE",
+            [tuple(moves)],
+        )
+        current = dict(self.env.cr.fetchall())
+        by_target = defaultdict(list)
+        for appointment_id, name in moves.items():
+            if name not in APPOINTMENT_TRANSITIONS:
+                errors.append({'id': appointment_id, 'message': _("Unknown transition %s", name)})
+                continue
+            if appointment_id not in current:
+                errors.append({'id': appointment_id, 'message': _("Appointment not found")})
+                continue
+            sources, target = APPOINTMENT_TRANSITIONS[name]
+            if (current[appointment_id] or 'draft') not in sources:
+                errors.append({'id': appointment_id, 'message': _(
+                    "Cannot %(transition)s an appointment in status %(status)s",
+                    transition=name, status=current[appointment_id])})
+                continue
+            by_target[target].append(appointment_id)
+        for target, ids in by_target.items():
+            self.browse(ids).write({'appointment_status': target})
+            done.update(dict.fromkeys(ids, target))
+        return {'done': done, 'errors': sorted(errors, key=lambda error: error['id'])}
+
+    def get_tooth_chart_state(self, with_lines=False):
+        """State of the tooth chart widget: the marked teeth, as the numeric ids
+        of the SVG shapes, read from ``tooth_mask``; the procedure lines behind
+        them are only read ``with_lines``."""
+        self.ensure_one()
+        state = {
+            'appointment_id': self.id,
+            'marked_teeth': [str(tooth) for tooth in mask_to_teeth(self.tooth_mask)],
+        }
+        if with_lines:
+            state['lines'] = self.env['appointment.dental.procedure.line'].search_read(
+                [('appointment_id', '=', self.id)], ['tooth_no', 'service_item_id', 'cost'], order='id')
+        return state
+
+    def update_procedures(self, marked_teeth, service_item_id=None):
+        """Sync the procedure lines with the teeth marked on the tooth chart.
+
+        Lines of teeth no longer marked are removed and a line is added for each
+        newly marked tooth, with ``service_item_id`` or the default procedure
+        configured in the ``dental_clinic.default_procedure_product_id``
+        parameter; all of it in a single write. Returns the resulting chart
+        state, so the widget does not need to reload it.
+        """
+        self.ensure_one()
+        wanted = {'Tooth%s' % int(tooth) for tooth in marked_teeth}
+        self.env['appointment.dental.procedure.line'].flush_model(['appointment_id', 'tooth_no'])
+        self.env.cr.execute(
+            "SELECT id, tooth_no FROM appointment_dental_procedure_line WHERE appointment_id = %s",
+            [self.id],
+        )
+        existing = self.env.cr.fetchall()
+        present = {tooth_no for _line_id, tooth_no in existing if tooth_no}
+        commands = [Command.unlink(line_id) for line_id, tooth_no in existing if tooth_no and tooth_no not in wanted]
+        to_add = sorted(wanted - present, key=lambda tooth_no: int(tooth_no[len('Tooth'):]))
+        if to_add:
+            service_item_id = service_item_id or int(
+                self.env['ir.config_parameter'].sudo().get_param(DEFAULT_PROCEDURE_PARAM, 0))
+            if not service_item_id:
+                raise UserError(_("Choose the procedure to record for the marked teeth, "
+                                  "or configure a default procedure."))
+            commands += [
+                Command.create({'tooth_no': tooth_no, 'service_item_id': service_item_id})
+                for tooth_no in to_add
+            ]
+        if commands:
+            self.write({'procedure_line_id': commands})
+        return self.get_tooth_chart_state(with_lines=True)
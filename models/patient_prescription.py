@@ -1,5 +1,6 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
 from datetime import date
 
 class PatientPrescription(models.Model):
@@ -22,11 +23,21 @@ class PatientPrescription(models.Model):
     prescription_line_id = fields.One2many("patient.prescription.line", "prescription_id", string="Prescription Lines")
     notes = fields.Text("Notes")
 
-    @api.model
-    def create(self, vals):
-        if vals.get('prescription_serial', _('New Prescription')) == _('New Prescription'):
-            vals['prescription_serial'] = self.env['ir.sequence'].next_by_code('patient.appointment.prescription.sequence') or _('New Prescription')
-        return super().create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        pending = [vals for vals in vals_list if vals.get('prescription_serial', _('New Prescription')) == _('New Prescription')]
+        serials = self.env['ir.sequence'].next_clinic_serials('patient.appointment.prescription.sequence', len(pending))
+        for vals, serial in zip(pending, serials):
+            vals['prescription_serial'] = serial or _('New Prescription')
+        return super().create(vals_list)
+
+    def init(self):
+        # Delta sync watermarks.
+        create_index(self._cr, 'patient_prescription_write_date_id_index', self._table, ['write_date', 'id'])
+
+    def unlink(self):
+        self.env['dental.sync.tombstone']._record_deletion(self)
+        return super().unlink()
 
     @api.constrains('prescription_line_id')
     def _check_prescription_lines(self):
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from odoo import api, fields, models
+
+from .access_token import hash_token
+
+_logger = logging.getLogger(__name__)
+
+# Default "burst,refill per second" of each endpoint class, overridden by the
+# dental_clinic.rate_limit.<class> parameters; a bare number sets the burst and
+# keeps the default refill, "0" turns the limit off. Paging through /api/sync
+# takes many calls in a row, hence its own class.
+RATE_LIMIT_DEFAULTS = {
+    "read": "120,2",
+    "write": "30,0.5",
+    "export": "10,0.1",
+    "sync": "60,1",
+}
+RATE_LIMIT_PARAM = "dental_clinic.rate_limit.%s"
+# When set, buckets are kept in api_rate_limit_bucket and shared by all the
+# workers instead of living in each worker's memory.
+RATE_LIMIT_SHARED_PARAM = "dental_clinic.rate_limit_shared"
+RATE_LIMIT_BUCKETS = 8192
+
+
+class TokenBuckets(object):
+    """Thread-safe LRU of token buckets, local to the worker process. A bucket
+    evicted or not seen yet is full."""
+
+    def __init__(self, size=RATE_LIMIT_BUCKETS):
+        self.size = size
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """Take a token from bucket ``key``; returns 0 when one was available,
+        otherwise the seconds until the next one."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.size:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+token_buckets = TokenBuckets()
+
+
+class APIRateLimitBucket(models.Model):
+    """Request budget of an access token for a class of endpoints, when it is
+    shared between the workers through the database."""
+    _name = "api.rate.limit.bucket"
+    _description = "API Rate Limit Bucket"
+    _log_access = False
+    _sql_constraints = [
+        ('key_unique', 'unique(key)', 'There is one bucket per token and endpoint class.')
+    ]
+
+    key = fields.Char("Key", required=True)
+    tokens = fields.Float("Tokens", required=True)
+    updated_at = fields.Datetime("Last Refill", required=True, index=True)
+
+    @api.model
+    def _get_limit(self, endpoint_class):
+        """(burst, refill per second) of ``endpoint_class``, None when unlimited."""
+        default = RATE_LIMIT_DEFAULTS.get(endpoint_class, RATE_LIMIT_DEFAULTS["read"])
+        default_capacity, default_rate = [float(part) for part in default.split(",")]
+        value = self.env["ir.config_parameter"].sudo().get_param(RATE_LIMIT_PARAM % endpoint_class, default)
+        try:
+            parts = [float(part) for part in value.split(",")]
+            if len(parts) not in (1, 2) or (len(parts) == 2 and parts[1] <= 0):
+                raise ValueError(value)
+        except ValueError:
+            _logger.warning("Invalid %s: %r, using %s", RATE_LIMIT_PARAM % endpoint_class, value, default)
+            parts = [default_capacity, default_rate]
+        capacity, rate = parts if len(parts) == 2 else (parts[0], default_rate)
+        if capacity <= 0:
+            return None
+        return capacity, rate
+
+    @api.model
+    def _consume(self, token, endpoint_class):
+        """Take a request from the budget of ``token`` for ``endpoint_class``;
+        returns 0 when the request may go on, otherwise the seconds to wait."""
+        limit = self._get_limit(endpoint_class)
+        if limit is None:
+            return 0
+        key = "%s:%s" % (hash_token(token), endpoint_class)
+        if self.env["ir.config_parameter"].sudo().get_param(RATE_LIMIT_SHARED_PARAM):
+            try:
+                return self._consume_shared(key, *limit)
+            except Exception:
+                _logger.warning("Shared rate limit unavailable, falling back to the worker's", exc_info=True)
+        return token_buckets.consume(key, *limit)
+
+    def _consume_shared(self, key, capacity, rate):
+        # Not fields.Datetime.now(): the refill needs sub-second precision.
+        now = datetime.utcnow()
+        # In a transaction of our own, committed right away, so the bucket row is
+        # only locked for this statement and not for the whole request. Read
+        # committed: concurrent requests of the token wait for each other
+        # instead of failing to serialize.
+        level = "LEAST(%(capacity)s, b.tokens + %(rate)s * GREATEST(0, EXTRACT(EPOCH FROM %(now)s - b.updated_at)))"
+        with self.pool.cursor() as cr:
+            cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+            # A denied request leaves the row as it is, hence the updated_at test.
+            cr.execute("""
+                INSERT INTO api_rate_limit_bucket AS b (key, tokens, updated_at)
+                     VALUES (%(key)s, %(capacity)s - 1, %(now)s)
+                ON CONFLICT (key) DO UPDATE SET
+                    tokens = CASE WHEN {level} >= 1 THEN {level} - 1 ELSE b.tokens END,
+                    updated_at = CASE WHEN {level} >= 1 THEN %(now)s ELSE b.updated_at END
+                  RETURNING tokens, updated_at
+            """.format(level=level), {"key": key, "capacity": capacity, "rate": rate, "now": now})
+            tokens, updated_at = cr.fetchone()
+        if updated_at == now:
+            return 0
+        tokens = min(capacity, tokens + max(0, (now - updated_at).total_seconds()) * rate)
+        return (1 - tokens) / rate
+
+    @api.model
+    def _gc_rate_limit_buckets(self):
+        """Drop the buckets untouched for a day: they are full again by now,
+        which is also what a missing bucket stands for."""
+        self.env.cr.execute(
+            "DELETE FROM api_rate_limit_bucket WHERE updated_at < %s",
+            [fields.Datetime.now() - timedelta(days=1)],
+        )
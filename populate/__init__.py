@@ -0,0 +1,5 @@
+from . import clinic_doctor
+from . import patient
+from . import patient_appointment
+from . import appointment_dental_procedure_line
+from . import patient_prescription
@@ -0,0 +1,23 @@
+from odoo import models
+from odoo.tools import populate
+
+
+class AppointmentDentalProcedureLine(models.Model):
+    _inherit = "appointment.dental.procedure.line"
+    _populate_sizes = {"small": 15000, "medium": 150000, "large": 1500000}
+    _populate_dependencies = ["patient.appointment"]
+
+    def _populate_factories(self):
+        appointment_ids = self.env.registry.populated_models["patient.appointment"]
+        product_ids = self.env["product.product"].search([("sale_ok", "=", True)], limit=20).ids
+        if not product_ids:
+            product_ids = self.env["product.product"].create([
+                {"name": "Dental procedure %s" % i, "sale_ok": True, "list_price": 50.0 * i}
+                for i in range(1, 11)
+            ]).ids
+
+        return [
+            ("appointment_id", populate.randomize(appointment_ids)),
+            ("tooth_no", populate.randomize(["Tooth%s" % i for i in range(1, 33)])),
+            ("service_item_id", populate.randomize(product_ids)),
+        ]
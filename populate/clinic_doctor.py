@@ -0,0 +1,14 @@
+from odoo import models
+from odoo.tools import populate
+
+
+class ClinicDoctor(models.Model):
+    _inherit = "clinic.doctor"
+    _populate_sizes = {"small": 10, "medium": 20, "large": 100}
+
+    def _populate_factories(self):
+        return [
+            ("doctor_name", populate.constant("Doctor {counter}")),
+            ("specialty", populate.randomize(["General", "Orthodontics", "Endodontics", "Periodontics", "Surgery"])),
+            ("license_number", populate.constant("LIC-{counter}")),
+        ]
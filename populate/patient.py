@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from odoo import models
+from odoo.tools import populate
+
+
+class Patient(models.Model):
+    _inherit = "patient.patient"
+    _populate_sizes = {"small": 2000, "medium": 20000, "large": 200000}
+
+    def _populate_factories(self):
+        def get_date_of_birth(random=None, **kwargs):
+            return date(1940, 1, 1) + timedelta(days=random.randint(0, 30000))
+
+        def get_contact_number(random=None, **kwargs):
+            return "+1 555 %07d" % random.randint(0, 9999999)
+
+        return [
+            ("patient_name", populate.constant("Patient {counter}")),
+            ("contact_number", populate.compute(get_contact_number)),
+            ("date_of_birth", populate.compute(get_date_of_birth)),
+            ("gender", populate.randomize(["male", "female"])),
+            ("marital_status", populate.randomize(["single", "married", "divorced", False])),
+            ("blood_type", populate.randomize(["a-", "a+", "b-", "b+", False])),
+            ("occupation", populate.randomize(["Teacher", "Engineer", "Student", "Retired", False])),
+        ]
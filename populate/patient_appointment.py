@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from odoo import models
+from odoo.tools import populate
+
+# Appointments are laid out on a grid of one hour slots, 8 per day from this
+# Monday on, each doctor taking every n-th one, so generated bookings never
+# overlap and pass the doctor availability constraint.
+SLOT_ORIGIN = datetime(2020, 1, 6, 8, 0)
+SLOTS_PER_DAY = 8
+
+
+class PatientAppointment(models.Model):
+    _inherit = "patient.appointment"
+    _populate_sizes = {"small": 10000, "medium": 100000, "large": 1000000}
+    _populate_dependencies = ["patient.patient", "clinic.doctor"]
+
+    def _populate_factories(self):
+        patient_ids = self.env.registry.populated_models["patient.patient"]
+        doctor_ids = self.env.registry.populated_models["clinic.doctor"]
+
+        def get_doctor_id(counter=0, **kwargs):
+            return doctor_ids[counter % len(doctor_ids)]
+
+        def get_start(counter=0, **kwargs):
+            slot = counter // len(doctor_ids)
+            day, hour = divmod(slot, SLOTS_PER_DAY)
+            return SLOT_ORIGIN + timedelta(days=day, hours=hour)
+
+        return [
+            ("name", populate.constant("Appointment {counter}")),
+            ("patient_id", populate.randomize(patient_ids)),
+            ("doctor_id", populate.compute(get_doctor_id)),
+            ("start", populate.compute(get_start)),
+            ("duration", populate.randomize([0.5, 0.75, 1.0])),
+            ("appointment_status", populate.randomize(
+                ["draft", "confirm", "in_exam", "completed_exam", "completed_appointment", "cancelled"],
+                [0.05, 0.15, 0.05, 0.05, 0.6, 0.1],
+            )),
+            ("appointment_type", populate.randomize(["reserve", "in_person"], [0.8, 0.2])),
+        ]
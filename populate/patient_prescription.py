@@ -0,0 +1,26 @@
+from odoo import Command, models
+from odoo.tools import populate
+
+
+class PatientPrescription(models.Model):
+    _inherit = "patient.prescription"
+    _populate_sizes = {"small": 3000, "medium": 30000, "large": 300000}
+    _populate_dependencies = ["patient.appointment"]
+
+    def _populate_factories(self):
+        appointment_ids = self.env.registry.populated_models["patient.appointment"]
+        medicines = ["Amoxicillin 500mg", "Ibuprofen 400mg", "Paracetamol 1g", "Chlorhexidine 0.12%"]
+
+        def get_lines(random=None, **kwargs):
+            return [
+                Command.create({
+                    "medicine_trade_name": random.choice(medicines),
+                    "therapeutic_regimen": "Every %s hours for %s days" % (random.choice([6, 8, 12]), random.randint(3, 7)),
+                })
+                for _i in range(random.randint(1, 3))
+            ]
+
+        return [
+            ("appointment_id", populate.randomize(appointment_ids)),
+            ("prescription_line_id", populate.compute(get_lines)),
+        ]
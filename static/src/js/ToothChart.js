@@ -34,16 +34,12 @@ odoo.define('dental_clinic.PatientAppointmentToothChart', function(require) {
            try {
                if (!this.props.appointmentId) return;
                
-               const teethData = await this.rpc({
-                   model: 'dental.procedure.line',
-                   method: 'search_read',
-                   fields: ['tooth_number', 'procedure_id'],
-                   domain: [['appointment_id', '=', this.props.appointmentId]]
-               });
-               
-               this.state.teethData = teethData;
-               // Convert to string to match SVG IDs
-               this.state.markedTeeth = teethData.map(item => item.tooth_number.toString());
+               const chartState = await this.orm.call(
+                   'patient.appointment',
+                   'get_tooth_chart_state',
+                   [[this.props.appointmentId]]
+               );
+               this.applyChartState(chartState);
            } catch (error) {
                console.error("Error loading teeth data:", error);
                this.notification.add(
@@ -53,6 +49,12 @@ odoo.define('dental_clinic.PatientAppointmentToothChart', function(require) {
            }
        }
 
+       applyChartState(chartState) {
+           this.state.teethData = chartState.lines || [];
+           // marked_teeth already holds the SVG ids ("17" for Tooth17)
+           this.state.markedTeeth = chartState.marked_teeth;
+       }
+
        setupTeethInteractions() {
            const chartElement = this.chartRef.el;
            if (!chartElement) return;
@@ -110,19 +112,19 @@ odoo.define('dental_clinic.PatientAppointmentToothChart', function(require) {
                    return;
                }
                
-               await this.rpc({
-                   model: 'patient.appointment',
-                   method: 'update_procedures',
-                   args: [this.props.appointmentId, this.state.markedTeeth]
-               });
+               // The server returns the resulting chart, no reload needed
+               const chartState = await this.orm.call(
+                   'patient.appointment',
+                   'update_procedures',
+                   [[this.props.appointmentId], this.state.markedTeeth]
+               );
                
                this.notification.add(
                    this.env._t("Dental chart updated successfully"),
                    { type: 'success' }
                );
                
-               // Recargar datos para sincronización
-               await this.loadInitialData();
+               this.applyChartState(chartState);
                this.updateChartMarks();
            } catch (error) {
                console.error("Error updating procedures:", error);
@@ -0,0 +1,14 @@
+from . import test_access_token
+from . import test_api_batch
+from . import test_api_bulk
+from . import test_api_common
+from . import test_appointment
+from . import test_bulk_operation
+from . import test_clinic_analytics
+from . import test_clinic_doctor
+from . import test_clinic_kpi
+from . import test_delta_sync
+from . import test_idempotency_key
+from . import test_ir_sequence
+from . import test_patient
+from . import test_rate_limit
@@ -0,0 +1,21 @@
+from odoo.tests import HttpCase
+
+
+class ClinicApiCase(HttpCase):
+    """Calls the JSON routes of the clinic API with an access token."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.api_user = cls.env.ref('base.user_admin')
+        cls.access_token = cls.env['api.access_token'].create_token(cls.api_user.id)
+
+    def api_call(self, path, params=None, method='POST'):
+        """``result`` of the JSON-RPC call of ``path`` with ``params``."""
+        response = self.opener.request(
+            method, self.base_url() + path,
+            json={'jsonrpc': '2.0', 'method': 'call', 'id': 1, 'params': params or {}},
+            headers={'access_token': self.access_token},
+        )
+        response.raise_for_status()
+        return response.json()['result']
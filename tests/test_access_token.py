@@ -0,0 +1,135 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from freezegun import freeze_time
+
+from odoo import fields
+from odoo.tests import BaseCase, TransactionCase
+
+from odoo.addons.dental_clinic.models.access_token import TokenCache, TokenInfo, hash_token, token_cache
+
+
+class TestTokenCache(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        self.info = TokenInfo(2, fields.Datetime.now() + timedelta(days=1), "userinfo")
+
+    def test_lru(self):
+        cache = TokenCache(size=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, self.info)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), self.info)
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_ttl(self):
+        cache = TokenCache(ttl=0)
+        cache.put("a", self.info)
+        self.assertIsNone(cache.get("a"))
+
+    def test_token_expiry(self):
+        cache = TokenCache()
+        cache.put("a", self.info._replace(token_expiry_date=fields.Datetime.now() - timedelta(seconds=1)))
+        self.assertIsNone(cache.get("a"))
+
+
+class TestAccessToken(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.AccessToken = cls.env['api.access_token']
+        cls.raw_token = cls.AccessToken.create_token(cls.env.user.id)
+        cls.other_raw_token = cls.AccessToken.create_token(cls.env.user.id)
+        cls.access_token = cls.AccessToken._find_by_token(cls.raw_token)
+
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+
+    def _key(self, raw_token):
+        return (self.env.cr.dbname, hash_token(raw_token))
+
+    def test_cache_hit(self):
+        info = self.AccessToken._get_token_info(self.raw_token)
+        self.assertEqual(info.user_id, self.env.user.id)
+        self.assertEqual(info.scope, "userinfo")
+        hits = token_cache.hits
+        with self.assertQueryCount(1):
+            # Only the probe for revocations, not the token lookup.
+            self.assertEqual(self.AccessToken._get_token_info(self.raw_token), info)
+        self.assertEqual(token_cache.hits, hits + 1)
+
+    def test_unknown_token(self):
+        self.assertIsNone(self.AccessToken._get_token_info("access_token_unknown"))
+        self.assertIsNone(self.AccessToken._get_token_info(""))
+
+    def test_expiry(self):
+        self.assertTrue(self.AccessToken._get_token_info(self.raw_token))
+        with freeze_time(fields.Datetime.now() + timedelta(days=2)):
+            self.assertIsNone(self.AccessToken._get_token_info(self.raw_token))
+
+    def test_revocation(self):
+        self.assertTrue(self.AccessToken._get_token_info(self.raw_token))
+        self.assertTrue(self.AccessToken._get_token_info(self.other_raw_token))
+        self.access_token.unlink()
+        self.assertIsNone(self.AccessToken._get_token_info(self.raw_token))
+        # The other tokens stay cached.
+        hits = token_cache.hits
+        self.assertTrue(self.AccessToken._get_token_info(self.other_raw_token))
+        self.assertEqual(token_cache.hits, hits + 1)
+
+    def test_revocation_by_another_worker(self):
+        info = self.AccessToken._get_token_info(self.raw_token)
+        self.access_token.write({'scope': 'other'})
+        # As if the write had happened in another worker: only the revocation
+        # row tells this one.
+        token_cache.put(self._key(self.raw_token), info)
+        self.assertEqual(self.AccessToken._get_token_info(self.raw_token).scope, 'other')
+
+    def test_write_keeps_registry_caches(self):
+        self.AccessToken._get_token_info(self.raw_token)
+        with patch.object(type(self.env.registry), 'clear_cache') as clear_cache:
+            self.access_token.write({'scope': 'other'})
+            self.access_token.unlink()
+        clear_cache.assert_not_called()
+
+
+class TestCleanupExpiredTokens(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        AccessToken = cls.env['api.access_token']
+        cls.live = AccessToken._find_by_token(AccessToken.create_token(cls.env.user.id))
+        cls.expired = AccessToken.browse([
+            AccessToken._find_by_token(AccessToken.create_token(cls.env.user.id)).id for _i in range(5)
+        ])
+        cls.env.cr.execute(
+            "UPDATE api_access_token SET token_expiry_date = (now() AT TIME ZONE 'UTC') - interval '1 hour'"
+            " WHERE id IN %s", [tuple(cls.expired.ids)])
+        cls.env['api.access_token'].invalidate_model()
+
+    def test_cleanup_in_batches(self):
+        result = self.env['api.access_token'].cleanup_expired_tokens(batch_size=2, time_budget=60)
+        self.assertEqual(result['deleted'], 5)
+        self.assertFalse(self.expired.exists())
+        self.assertTrue(self.live.exists())
+
+    def test_cleanup_time_budget(self):
+        result = self.env['api.access_token'].cleanup_expired_tokens(batch_size=2, time_budget=0)
+        self.assertEqual(result['deleted'], 0)
+        self.assertEqual(len(self.expired.exists()), 5)
+
+    def test_cleanup_revocations(self):
+        self.env.cr.execute("""
+            INSERT INTO api_access_token_revocation (token, revoked_at)
+            VALUES ('old', (now() AT TIME ZONE 'UTC') - interval '2 days'),
+                   ('recent', now() AT TIME ZONE 'UTC')
+        """)
+        self.env['api.access_token'].cleanup_expired_tokens(time_budget=60)
+        self.env.cr.execute("SELECT token FROM api_access_token_revocation WHERE token IN ('old', 'recent')")
+        self.assertEqual(self.env.cr.fetchall(), [('recent',)])
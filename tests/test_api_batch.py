@@ -0,0 +1,68 @@
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from .common import ClinicApiCase
+
+
+@tagged('post_install', '-at_install')
+class TestBatch(ClinicApiCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.product = cls.env['product.product'].create({'name': 'Extraction', 'sale_ok': True})
+
+    def test_batch_with_refs(self):
+        result = self.api_call('/api/batch', {'operations': [
+            {'ref': 'p', 'op': 'create', 'resource': 'patients',
+             'values': {'patient_name': 'Batch Patient', 'contact_number': '555'}},
+            {'ref': 'a', 'op': 'create', 'resource': 'appointments',
+             'values': {'patient_id': {'$ref': 'p'}, 'start': '2024-03-04 08:00:00', 'duration': 1.0}},
+            {'op': 'create', 'resource': 'procedure_lines',
+             'values': {'appointment_id': {'$ref': 'a'}, 'tooth_no': 'Tooth17', 'service_item_id': self.product.id}},
+            {'op': 'update', 'resource': 'patients', 'record_id': {'$ref': 'p'}, 'values': {'occupation': 'Pilot'}},
+        ]})
+        self.assertTrue(result['success'])
+        self.assertEqual([operation['status'] for operation in result['data']['results']], ['ok'] * 4)
+        patient = self.env['patient.patient'].browse(result['data']['results'][0]['id'])
+        self.assertEqual(patient.occupation, 'Pilot')
+        appointment = patient.appointment_id
+        self.assertEqual(appointment.id, result['data']['results'][1]['id'])
+        self.assertEqual(appointment.procedure_line_id.tooth_no, 'Tooth17')
+
+    def test_batch_rolled_back(self):
+        result = self.api_call('/api/batch', {'operations': [
+            {'ref': 'p', 'op': 'create', 'resource': 'patients',
+             'values': {'patient_name': 'Rolled Back', 'contact_number': '555'}},
+            {'op': 'update', 'resource': 'patients', 'record_id': {'$ref': 'p'}, 'values': {'patient_serial': 'X'}},
+        ]})
+        self.assertFalse(result['success'])
+        self.assertEqual(result['data']['results'][-1]['index'], 1)
+        self.assertIn('patient_serial', result['data']['results'][-1]['message'])
+        self.assertFalse(self.env['patient.patient'].search([('patient_name', '=', 'Rolled Back')]))
+
+    @mute_logger('odoo.sql_db')
+    def test_batch_savepoint(self):
+        result = self.api_call('/api/batch', {'operations': [
+            {'op': 'create', 'resource': 'patients',
+             'values': {'patient_name': 'Kept', 'contact_number': '1', 'date_of_birth': '2000-01-01'}},
+            {'op': 'create', 'resource': 'patients', 'savepoint': True,
+             'values': {'patient_name': 'Kept', 'contact_number': '2', 'date_of_birth': '2000-01-01'}},
+            {'op': 'delete', 'resource': 'patients', 'record_id': 0, 'savepoint': True},
+            {'op': 'create', 'resource': 'patients', 'values': {'patient_name': 'Also Kept'}},
+        ]})
+        self.assertFalse(result['success'])
+        self.assertEqual([operation['status'] for operation in result['data']['results']], ['ok', 'error', 'error', 'ok'])
+        self.assertEqual(self.env['patient.patient'].search_count([('patient_name', 'in', ('Kept', 'Also Kept'))]), 2)
+
+    def test_batch_unresolved_ref(self):
+        result = self.api_call('/api/batch', {'operations': [
+            {'op': 'create', 'resource': 'appointments', 'values': {'patient_id': {'$ref': 'nobody'}}},
+        ]})
+        self.assertFalse(result['success'])
+        self.assertIn('nobody', result['data']['results'][0]['message'])
+
+    def test_batch_invalid(self):
+        self.assertIn('400', self.api_call('/api/batch', {'operations': []}))
+        result = self.api_call('/api/batch', {'operations': [{'op': 'create', 'resource': 'doctors', 'values': {}}]})
+        self.assertIn('unknown resource', result['data']['results'][0]['message'])
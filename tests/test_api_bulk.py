@@ -0,0 +1,42 @@
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from .common import ClinicApiCase
+
+
+@tagged('post_install', '-at_install')
+class TestPatientsBulk(ClinicApiCase):
+
+    def test_bulk_create(self):
+        audits = self.env['dental.bulk.audit'].search([])
+        result = self.api_call('/api/patients/bulk', {'patients': [
+            {'patient_name': 'Bulk One', 'contact_number': '111', 'date_of_birth': '1990-01-01'},
+            {'patient_name': 'Bulk Two', 'contact_number': '222', 'gender': 'female'},
+            {'patient_name': 'No Contact'},
+            'not a row',
+        ]})
+        self.assertFalse(result['success'])
+        self.assertEqual([row['index'] for row in result['data']['created']], [0, 1])
+        self.assertEqual([error['index'] for error in result['data']['errors']], [2, 3])
+        patients = self.env['patient.patient'].browse([row['id'] for row in result['data']['created']])
+        self.assertEqual(patients.mapped('patient_name'), ['Bulk One', 'Bulk Two'])
+        self.assertEqual(patients.mapped('patient_serial'), [row['patient_serial'] for row in result['data']['created']])
+        self.assertEqual(len(set(patients.mapped('patient_serial'))), 2)
+        audit = self.env['dental.bulk.audit'].search([]) - audits
+        self.assertEqual(audit.record_count, 2)
+
+    @mute_logger('odoo.sql_db')
+    def test_bulk_create_fallback(self):
+        """A row the database rejects is reported alone, the others are created."""
+        result = self.api_call('/api/patients/bulk', {'patients': [
+            {'patient_name': 'Twin', 'contact_number': '1', 'date_of_birth': '2000-01-01'},
+            {'patient_name': 'Twin', 'contact_number': '2', 'date_of_birth': '2000-01-01'},
+            {'patient_name': 'Single', 'contact_number': '3'},
+        ]})
+        self.assertEqual([row['index'] for row in result['data']['created']], [0, 2])
+        self.assertEqual([error['index'] for error in result['data']['errors']], [1])
+        self.assertEqual(self.env['patient.patient'].search_count([('patient_name', '=', 'Twin')]), 1)
+
+    def test_bulk_create_invalid(self):
+        self.assertIn('400', self.api_call('/api/patients/bulk', {'patients': []}))
+        self.assertFalse(self.env['patient.patient'].search([('patient_name', 'like', 'Bulk')]))
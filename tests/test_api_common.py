@@ -0,0 +1,24 @@
+import datetime
+
+from odoo.tests import BaseCase
+
+from odoo.addons.dental_clinic.controllers.common import decode_cursor, encode_cursor
+
+
+class TestCursor(BaseCase):
+
+    def test_round_trip(self):
+        for values in ([], [1], ["2024-03-04 08:00:00.123456", 42], [None, "é", 1.5, True]):
+            cursor = encode_cursor(values)
+            self.assertNotIn("=", cursor)
+            self.assertEqual(decode_cursor(cursor), values)
+        self.assertEqual(decode_cursor(encode_cursor((7, 8))), [7, 8])
+
+    def test_dates_as_isoformat(self):
+        when = datetime.datetime(2024, 3, 4, 8, 0, 0, 123456)
+        self.assertEqual(decode_cursor(encode_cursor([when, 3])), [when.isoformat(), 3])
+
+    def test_malformed(self):
+        for cursor in ("%%%", "bm90IGpzb24", "eyJhIjogMX0", "gICA", None):
+            with self.assertRaises(ValueError, msg=cursor):
+                decode_cursor(cursor)
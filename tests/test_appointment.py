@@ -0,0 +1,123 @@
+from odoo.exceptions import UserError
+from odoo.tests import BaseCase, TransactionCase
+
+from odoo.addons.dental_clinic.models.appointment_dental_procedure_line import (
+    TOOTH_COUNT, mask_to_teeth, teeth_to_mask, tooth_bit,
+)
+from odoo.addons.dental_clinic.models.patient_appointment import APPOINTMENT_TRANSITIONS, DEFAULT_PROCEDURE_PARAM
+
+
+class TestToothMask(BaseCase):
+
+    def test_tooth_bit(self):
+        self.assertEqual(tooth_bit(1), 1)
+        self.assertEqual(tooth_bit('Tooth2'), 2)
+        self.assertEqual(tooth_bit('31'), 1 << 30)
+        # Tooth32 is the sign bit of the int4 column.
+        self.assertEqual(tooth_bit(32), -2 ** 31)
+        self.assertEqual(tooth_bit('Tooth32'), -2 ** 31)
+        for tooth in (0, 33, -1, 'Tooth0', 'Tooth33'):
+            with self.assertRaises(ValueError, msg=tooth):
+                tooth_bit(tooth)
+
+    def test_round_trip(self):
+        for teeth in ([], [1], [32], [1, 32], [16, 17], list(range(1, TOOTH_COUNT + 1))):
+            mask = teeth_to_mask(teeth)
+            self.assertTrue(-2 ** 31 <= mask < 2 ** 31, "mask must fit a signed 32-bit integer")
+            self.assertEqual(mask_to_teeth(mask), teeth)
+        self.assertEqual(teeth_to_mask([32]), -2 ** 31)
+        self.assertEqual(teeth_to_mask(['Tooth1', 'Tooth32']), 1 - 2 ** 31)
+        self.assertEqual(teeth_to_mask(range(1, TOOTH_COUNT + 1)), -1)
+        self.assertEqual(teeth_to_mask([3, 3, 'Tooth3']), 4)
+        self.assertEqual(mask_to_teeth(None), [])
+        self.assertEqual(mask_to_teeth(0), [])
+
+
+class TestAppointment(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Appointment = cls.env['patient.appointment']
+        cls.draft, cls.confirmed, cls.cancelled, cls.completed = cls.Appointment.create([
+            {'start': '2024-03-04 08:00:00', 'duration': 1.0, 'appointment_status': status}
+            for status in ('draft', 'confirm', 'cancelled', 'completed_appointment')
+        ])
+
+    def test_tooth_mask_stored(self):
+        product = self.env['product.product'].create({'name': 'Filling', 'sale_ok': True})
+        self.draft.write({'procedure_line_id': [
+            (0, 0, {'service_item_id': product.id, 'tooth_no': tooth}) for tooth in ('Tooth1', 'Tooth32')
+        ]})
+        self.env.flush_all()
+        self.env.cr.execute("SELECT tooth_mask FROM patient_appointment WHERE id = %s", [self.draft.id])
+        self.assertEqual(self.env.cr.fetchone()[0], 1 - 2 ** 31)
+        self.assertEqual(self.draft.get_tooth_chart_state()['marked_teeth'], ['1', '32'])
+        appointments = self.Appointment.search([('treated_tooth', '=', 32)])
+        self.assertEqual(appointments, self.draft)
+        appointments = self.Appointment.search([('treated_tooth', 'in', [2, 31])])
+        self.assertFalse(appointments)
+
+    def test_update_procedures(self):
+        filling, crown = self.env['product.product'].create([
+            {'name': 'Filling', 'sale_ok': True}, {'name': 'Crown', 'sale_ok': True},
+        ])
+        state = self.draft.update_procedures(['3', 14], service_item_id=filling.id)
+        self.assertEqual(state['marked_teeth'], ['3', '14'])
+        self.assertEqual([line['tooth_no'] for line in state['lines']], ['Tooth3', 'Tooth14'])
+        lines = self.draft.procedure_line_id
+        # Tooth 3 stays as it is, 14 goes, 32 comes with the default procedure.
+        self.env['ir.config_parameter'].sudo().set_param(DEFAULT_PROCEDURE_PARAM, crown.id)
+        state = self.draft.update_procedures([3, 32])
+        self.assertEqual(state['marked_teeth'], ['3', '32'])
+        self.assertIn(lines.filtered(lambda line: line.tooth_no == 'Tooth3'), self.draft.procedure_line_id)
+        self.assertEqual(self.draft.procedure_line_id.mapped('service_item_id'), filling | crown)
+        self.assertEqual(self.draft.tooth_mask, teeth_to_mask([3, 32]))
+        self.assertEqual(self.draft.update_procedures([])['marked_teeth'], [])
+        self.assertFalse(self.draft.procedure_line_id)
+
+    def test_update_procedures_without_procedure(self):
+        self.env['ir.config_parameter'].sudo().set_param(DEFAULT_PROCEDURE_PARAM, False)
+        with self.assertRaises(UserError):
+            self.confirmed.update_procedures([5])
+        # Nothing to add: no procedure needed.
+        self.assertEqual(self.confirmed.update_procedures([])['marked_teeth'], [])
+
+    def test_find_transition(self):
+        self.assertEqual(self.Appointment._find_transition('draft', 'confirm'), 'confirm')
+        self.assertEqual(self.Appointment._find_transition('in_exam', 'completed_appointment'), 'complete')
+        self.assertIsNone(self.Appointment._find_transition('draft', 'completed_appointment'))
+        self.assertIsNone(self.Appointment._find_transition('cancelled', 'confirm'))
+
+    def test_apply_transitions(self):
+        missing_id = self.completed.id + 1000
+        result = self.Appointment.apply_transitions({
+            str(self.draft.id): 'confirm',
+            self.confirmed.id: 'reset_to_draft',
+            self.cancelled.id: 'teleport',
+            self.completed.id: 'cancel',
+            missing_id: 'confirm',
+        })
+        self.assertEqual(result['done'], {self.draft.id: 'confirm'})
+        self.assertEqual([error['id'] for error in result['errors']],
+                         sorted([self.confirmed.id, self.cancelled.id, self.completed.id, missing_id]))
+        self.assertEqual(self.draft.appointment_status, 'confirm')
+        # Rejected moves leave the appointments as they were.
+        self.assertEqual(self.confirmed.appointment_status, 'confirm')
+        self.assertEqual(self.cancelled.appointment_status, 'cancelled')
+        self.assertEqual(self.completed.appointment_status, 'completed_appointment')
+
+    def test_every_transition_source(self):
+        for name, (sources, target) in APPOINTMENT_TRANSITIONS.items():
+            for status in ('draft', 'confirm', 'in_exam', 'completed_exam', 'completed_appointment', 'cancelled'):
+                appointment = self.Appointment.create({'start': '2024-03-05 08:00:00', 'appointment_status': status})
+                result = self.Appointment.apply_transitions({appointment.id: name})
+                if status in sources:
+                    self.assertEqual(result, {'done': {appointment.id: target}, 'errors': []})
+                    self.assertEqual(appointment.appointment_status, target)
+                else:
+                    self.assertFalse(result['done'], "%s from %s" % (name, status))
+                    self.assertEqual(appointment.appointment_status, status)
+
+    def test_apply_no_transition(self):
+        self.assertEqual(self.Appointment.apply_transitions({}), {'done': {}, 'errors': []})
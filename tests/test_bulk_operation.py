@@ -0,0 +1,57 @@
+import json
+
+from odoo.tests import TransactionCase
+
+
+class TestBulkOperation(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Patient = cls.env['patient.patient']
+        cls.Audit = cls.env['dental.bulk.audit']
+
+    def _messages(self, records):
+        return self.env['mail.message'].search_count([('model', '=', records._name), ('res_id', 'in', records.ids)])
+
+    def test_bulk_create(self):
+        patients = self.Patient.bulk_create([
+            {'patient_name': 'Bulk A', 'contact_number': '1'},
+            {'patient_name': 'Bulk B', 'gender': 'male'},
+        ], reason='import')
+        self.assertEqual(patients.mapped('patient_name'), ['Bulk A', 'Bulk B'])
+        self.assertNotIn('tracking_disable', patients.env.context)
+        self.assertEqual(self._messages(patients), 0)
+        audit = self.Audit.search([('res_model', '=', 'patient.patient')], limit=1)
+        self.assertEqual((audit.operation, audit.record_count, audit.reason), ('create', 2, 'import'))
+        self.assertEqual(json.loads(audit.res_ids), patients.ids)
+        self.assertEqual(json.loads(audit.changes), ['contact_number', 'gender', 'patient_name'])
+
+    def test_bulk_write(self):
+        patients = self.Patient.create([{'patient_name': 'Write A'}, {'patient_name': 'Write B'}])
+        messages = self._messages(patients)
+        patients.bulk_write({'contact_number': '999'}, reason='fix')
+        self.assertEqual(patients.mapped('contact_number'), ['999', '999'])
+        # contact_number is tracked, but not by bulk writes.
+        self.assertEqual(self._messages(patients), messages)
+        audit = self.Audit.search([], limit=1)
+        self.assertEqual((audit.operation, audit.record_count), ('write', 2))
+        self.assertEqual(json.loads(audit.changes), [{'ids': patients.ids, 'values': {'contact_number': '999'}}])
+
+    def test_bulk_update(self):
+        appointments = self.env['patient.appointment'].create([
+            {'start': '2024-03-04 %02d:00:00' % hour, 'duration': 0.5} for hour in (8, 9, 10)
+        ])
+        first, second, third = appointments
+        messages = self._messages(appointments)
+        appointments.bulk_update({
+            first.id: {'start': '2024-03-05 08:00:00'},
+            str(second.id): {'start': '2024-03-05 08:00:00'},
+            third.id: {'chief_complaints': 'Toothache'},
+        })
+        self.assertEqual(first.start, second.start)
+        self.assertEqual(third.chief_complaints, 'Toothache')
+        self.assertEqual(self._messages(appointments), messages)
+        audit = self.Audit.search([], limit=1)
+        self.assertEqual(audit.record_count, 3)
+        self.assertEqual(sorted(len(change['ids']) for change in json.loads(audit.changes)), [1, 2])
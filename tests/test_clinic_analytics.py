@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime
+
+from odoo.tests import TransactionCase
+
+from odoo.addons.dental_clinic.models.clinic_analytics import EPOCH, HOURS_PER_WEEK, hour_of_week, numpy
+
+
+class TestClinicAnalytics(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ir.config_parameter'].sudo().set_param('dental_clinic.opening_hours', '8-18')
+        cls.env['ir.config_parameter'].sudo().set_param('dental_clinic.open_weekdays', '0,1,2,3,4')
+        # Ordered by name, not by id: the loop must not mix the doctors up.
+        cls.doctor_b, cls.doctor_a, cls.doctor_idle = cls.env['clinic.doctor'].create([
+            {'doctor_name': 'Zoe'}, {'doctor_name': 'Adam'}, {'doctor_name': 'Nobody'},
+        ])
+        # Monday 4 to Monday 11 March 2024, UTC.
+        cls.date_from, cls.date_to = datetime(2024, 3, 4), datetime(2024, 3, 11)
+        cls.env['patient.appointment'].create([
+            # Interleaved appointments of both doctors on Monday.
+            {'doctor_id': cls.doctor_a.id, 'start': '2024-03-04 08:00:00', 'duration': 1.0},
+            {'doctor_id': cls.doctor_b.id, 'start': '2024-03-04 08:30:00', 'duration': 0.5},
+            {'doctor_id': cls.doctor_a.id, 'start': '2024-03-04 09:15:00', 'duration': 0.75,
+             'appointment_status': 'confirm'},
+            {'doctor_id': cls.doctor_b.id, 'start': '2024-03-04 09:30:00', 'duration': 1.5,
+             'appointment_status': 'completed_appointment'},
+            {'doctor_id': cls.doctor_a.id, 'start': '2024-03-04 11:00:00', 'duration': 2.0,
+             'appointment_status': 'completed_appointment'},
+            # Cancelled: counted, but no booked hours and no gap.
+            {'doctor_id': cls.doctor_a.id, 'start': '2024-03-04 10:00:00', 'duration': 1.0,
+             'appointment_status': 'cancelled'},
+            # Next day: no gap with Monday's last appointment.
+            {'doctor_id': cls.doctor_a.id, 'start': '2024-03-05 14:10:00', 'duration': 0.25},
+            # Overlapping the range on both sides.
+            {'doctor_id': cls.doctor_b.id, 'start': '2024-03-03 23:00:00', 'duration': 2.0,
+             'appointment_status': 'in_exam'},
+            {'doctor_id': cls.doctor_b.id, 'start': '2024-03-10 23:30:00', 'duration': 1.0},
+            # Outside the range or without doctor: left out.
+            {'doctor_id': cls.doctor_a.id, 'start': '2024-03-12 08:00:00', 'duration': 1.0},
+            {'start': '2024-03-04 08:00:00', 'duration': 1.0},
+        ])
+
+    def test_hour_of_week(self):
+        # The epoch is a Thursday.
+        self.assertEqual(hour_of_week(0), 3 * 24)
+        self.assertEqual(hour_of_week(4 * 24 + 5), 5)
+        self.assertEqual(hour_of_week(int((self.date_from - EPOCH).total_seconds() // 3600) + 1), 1)
+        self.assertEqual(hour_of_week(HOURS_PER_WEEK * 100 + 4 * 24 - 1), HOURS_PER_WEEK - 1)
+
+    def test_loop_figures(self):
+        Analytics = self.env['dental.clinic.analytics']
+        result = Analytics._compute_utilization_loop(
+            self.date_from, self.date_to, [self.doctor_idle.id], min_slot=30, tz='UTC')
+        self.assertEqual(result['available_hours_by_hour_of_week'][8], 1.0)
+        self.assertEqual(sum(result['available_hours_by_hour_of_week']), 50.0)
+        doctors = {doctor['doctor_id']: doctor for doctor in result['doctors']}
+        self.assertEqual(list(doctors), sorted(doctors))
+        doctor_a = doctors[self.doctor_a.id]
+        self.assertEqual(doctor_a['appointments'], 5)
+        self.assertEqual(doctor_a['booked_hours'], 4.0)
+        self.assertEqual(doctor_a['cancellation_rate'], 0.2)
+        self.assertEqual(doctor_a['no_show_rate'], 0.75)
+        # 09:00-09:15 and 10:00-11:00 on Monday, the cancelled one left out.
+        self.assertEqual(doctor_a['gap_count'], 2)
+        self.assertEqual(doctor_a['mean_gap_hours'], 0.62)
+        self.assertEqual(doctor_a['short_gap_hours'], 0.25)
+        doctor_b = doctors[self.doctor_b.id]
+        self.assertEqual(doctor_b['appointments'], 4)
+        # Only the part of the appointments overlapping the range is booked.
+        self.assertEqual(doctor_b['booked_hours'], 3.5)
+        # 01:00-08:30 after the one started on Sunday, then 09:00-09:30.
+        self.assertEqual(doctor_b['gap_count'], 2)
+        self.assertEqual(doctors[self.doctor_idle.id]['appointments'], 0)
+        self.assertEqual(doctors[self.doctor_idle.id]['utilization'], 0.0)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_vectorized_matches_loop(self):
+        Analytics = self.env['dental.clinic.analytics']
+        for tz in ('UTC', 'Europe/Brussels', 'America/New_York'):
+            for doctor_ids in (None, [self.doctor_b.id], [self.doctor_idle.id]):
+                for min_slot in (15, 30, 90):
+                    args = (self.date_from, self.date_to, doctor_ids, min_slot, tz)
+                    self.assertEqual(
+                        Analytics.compute_utilization(*args), Analytics._compute_utilization_loop(*args),
+                        "tz=%s doctor_ids=%s min_slot=%s" % (tz, doctor_ids, min_slot),
+                    )
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase
+
+
+class TestClinicDoctor(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ir.config_parameter'].sudo().set_param('dental_clinic.opening_hours', '8-18')
+        cls.env['ir.config_parameter'].sudo().set_param('dental_clinic.open_weekdays', '0,1,2,3,4')
+        cls.Appointment = cls.env['patient.appointment']
+        cls.doctor, cls.other_doctor = cls.env['clinic.doctor'].create([
+            {'doctor_name': 'Slots'}, {'doctor_name': 'Other'},
+        ])
+        # Friday 8 March 2024, then Monday 11.
+        cls.Appointment.create([
+            {'doctor_id': cls.doctor.id, 'start': '2024-03-08 09:00:00', 'duration': 1.0},
+            {'doctor_id': cls.doctor.id, 'start': '2024-03-11 08:00:00', 'duration': 0.5},
+            {'doctor_id': cls.doctor.id, 'start': '2024-03-08 12:00:00', 'duration': 1.0,
+             'appointment_status': 'cancelled'},
+        ])
+
+    def _slots(self, duration=30, tz='UTC'):
+        slots = self.env['clinic.doctor'].search_free_slots(
+            [self.doctor.id, self.other_doctor.id], datetime(2024, 3, 8), datetime(2024, 3, 11, 12),
+            timedelta(minutes=duration), tz=tz)
+        return {
+            doctor_id: [(start.strftime('%a %H:%M'), stop.strftime('%a %H:%M')) for start, stop in windows]
+            for doctor_id, windows in slots.items()
+        }
+
+    def test_free_slots_opening_hours(self):
+        slots = self._slots()
+        # No night and no weekend; the cancelled appointment is free.
+        self.assertEqual(slots[self.doctor.id], [
+            ('Fri 08:00', 'Fri 09:00'), ('Fri 10:00', 'Fri 18:00'), ('Mon 08:30', 'Mon 12:00'),
+        ])
+        self.assertEqual(slots[self.other_doctor.id], [('Fri 08:00', 'Fri 18:00'), ('Mon 08:00', 'Mon 12:00')])
+
+    def test_free_slots_duration(self):
+        self.assertEqual(self._slots(duration=90)[self.doctor.id], [('Fri 10:00', 'Fri 18:00'), ('Mon 08:30', 'Mon 12:00')])
+
+    def test_free_slots_timezone(self):
+        # Brussels is UTC+1 in March: the clinic opens at 07:00 UTC.
+        self.assertEqual(self._slots(tz='Europe/Brussels')[self.doctor.id], [
+            ('Fri 07:00', 'Fri 09:00'), ('Fri 10:00', 'Fri 17:00'), ('Mon 07:00', 'Mon 08:00'), ('Mon 08:30', 'Mon 12:00'),
+        ])
+
+    def test_free_slots_closed(self):
+        slots = self.env['clinic.doctor'].search_free_slots(
+            [self.doctor.id], datetime(2024, 3, 9), datetime(2024, 3, 10, 23), timedelta(minutes=30), tz='UTC')
+        self.assertEqual(slots, {self.doctor.id: []})
+
+    def test_double_booking(self):
+        with self.assertRaises(ValidationError):
+            self.Appointment.create({'doctor_id': self.doctor.id, 'start': '2024-03-08 09:30:00', 'duration': 1.0})
+        with self.assertRaises(ValidationError):
+            self.Appointment.create({'doctor_id': self.doctor.id, 'start': '2024-03-08 08:00:00', 'duration': 3.0})
+
+    def test_booking_allowed(self):
+        self.Appointment.create([
+            # Back to back, over a cancelled one, for another doctor.
+            {'doctor_id': self.doctor.id, 'start': '2024-03-08 10:00:00', 'duration': 1.0},
+            {'doctor_id': self.doctor.id, 'start': '2024-03-08 12:00:00', 'duration': 1.0},
+            {'doctor_id': self.other_doctor.id, 'start': '2024-03-08 09:00:00', 'duration': 1.0},
+            {'doctor_id': self.doctor.id, 'start': '2024-03-08 09:15:00', 'duration': 0.5,
+             'appointment_status': 'cancelled'},
+        ])
+
+    def test_double_booking_within_batch(self):
+        with self.assertRaises(ValidationError):
+            self.Appointment.create([
+                {'doctor_id': self.doctor.id, 'start': '2024-03-12 %02d:00:00' % hour, 'duration': 1.0}
+                for hour in range(8, 18)
+            ] + [{'doctor_id': self.doctor.id, 'start': '2024-03-12 16:30:00', 'duration': 1.0}])
+
+    def test_batch_check_is_one_query(self):
+        appointments = self.Appointment.create([
+            {'doctor_id': self.doctor.id, 'start': datetime(2024, 3, 14) + timedelta(minutes=15 * index),
+             'duration': 0.25}
+            for index in range(40)
+        ])
+        self.env.flush_all()
+        # The row lock of the doctor and the overlap query.
+        with self.assertQueryCount(2):
+            appointments._check_doctor_availability()
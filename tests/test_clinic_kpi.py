@@ -0,0 +1,69 @@
+from datetime import date
+
+from odoo.tests import TransactionCase
+
+from odoo.addons.dental_clinic.models.clinic_kpi import KPI_WATERMARK
+
+
+class TestClinicKpi(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Kpi = cls.env['dental.clinic.kpi']
+        cls.doctor = cls.env['clinic.doctor'].create({'doctor_name': 'KPI'})
+        product = cls.env['product.product'].create({'name': 'Scaling', 'sale_ok': True, 'lst_price': 50.0})
+        cls.draft, cls.completed, cls.cancelled = cls.env['patient.appointment'].create([
+            {'doctor_id': cls.doctor.id, 'start': '2024-03-04 08:00:00', 'duration': 1.0,
+             'procedure_line_id': [(0, 0, {'service_item_id': product.id, 'tooth_no': 'Tooth3'})]},
+            {'doctor_id': cls.doctor.id, 'start': '2024-03-04 10:00:00', 'duration': 2.0,
+             'appointment_status': 'completed_appointment'},
+            {'doctor_id': cls.doctor.id, 'start': '2024-03-05 09:00:00', 'duration': 1.0,
+             'appointment_status': 'cancelled'},
+        ])
+
+    def _rows(self):
+        return {
+            (kpi.day, kpi.appointment_status): (kpi.appointment_count, kpi.booked_hours, kpi.revenue)
+            for kpi in self.Kpi.search([('doctor_id', '=', self.doctor.id)])
+        }
+
+    def test_refresh(self):
+        self.Kpi._refresh_kpis()
+        self.assertEqual(self._rows(), {
+            (date(2024, 3, 4), 'draft'): (1, 1.0, 50.0),
+            (date(2024, 3, 4), 'completed_appointment'): (1, 2.0, 0.0),
+            (date(2024, 3, 5), 'cancelled'): (1, 1.0, 0.0),
+        })
+
+    def test_moved_and_deleted(self):
+        self.Kpi._refresh_kpis()
+        self.draft.start = '2024-03-06 08:00:00'
+        self.cancelled.unlink()
+        self.Kpi._refresh_kpis()
+        self.assertEqual(self._rows(), {
+            (date(2024, 3, 4), 'completed_appointment'): (1, 2.0, 0.0),
+            (date(2024, 3, 6), 'draft'): (1, 1.0, 50.0),
+        })
+        self.assertFalse(self.env['dental.clinic.kpi.dirty'].search([]))
+
+    def test_watermark(self):
+        self.Kpi._refresh_kpis()
+        self.env.cr.execute("SELECT now() AT TIME ZONE 'UTC'")
+        self.assertEqual(self.env['dental.clinic.watermark']._get_watermark(KPI_WATERMARK), self.env.cr.fetchone()[0])
+        # Not an ir.config_parameter: writing one clears the caches of every worker.
+        self.assertFalse(self.env['ir.config_parameter'].sudo().get_param('dental_clinic.kpi_watermark'))
+
+    def test_dashboard(self):
+        self.Kpi._refresh_kpis()
+        dashboard = self.Kpi.get_dashboard('2024-03-04', '2024-03-05', [self.doctor.id])
+        self.assertEqual(dashboard['daily'], [
+            {'day': '2024-03-04', 'doctor_id': self.doctor.id, 'appointment_count': 2,
+             'booked_hours': 3.0, 'revenue': 50.0},
+            {'day': '2024-03-05', 'doctor_id': self.doctor.id, 'appointment_count': 1,
+             'booked_hours': 1.0, 'revenue': 0.0},
+        ])
+        [doctor] = dashboard['doctors']
+        self.assertEqual(doctor['appointment_count'], 3)
+        self.assertEqual(doctor['completion_rate'], 0.3333)
+        self.assertEqual(doctor['cancellation_rate'], 0.3333)
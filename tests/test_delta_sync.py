@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from odoo.tests import TransactionCase
+
+from odoo.addons.dental_clinic.models.delta_sync import (
+    SYNC_MODELS, SYNC_SETTLE_SECONDS, TOMBSTONE_RETENTION_DAYS,
+)
+
+
+class TestDeltaSync(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Sync = cls.env['dental.sync']
+        cls.env.cr.execute("SELECT now() AT TIME ZONE 'UTC'")
+        cls.now = cls.env.cr.fetchone()[0]
+        cls.settled = (cls.now - timedelta(seconds=SYNC_SETTLE_SECONDS), 0)
+        # Rows of the test are written at now(): a minute back only sees them.
+        cls.recent = (cls.now - timedelta(minutes=1), 0)
+        cls.patient = cls.env['patient.patient'].create({'patient_name': 'Sync', 'date_of_birth': '1990-05-01'})
+        cls.appointments = cls.env['patient.appointment'].create([
+            {'patient_id': cls.patient.id, 'start': '2024-03-04 08:00:00'},
+            {'patient_id': cls.patient.id, 'start': '2024-03-05 08:00:00'},
+        ])
+
+    def _watermarks(self, watermark):
+        return [watermark] * (len(SYNC_MODELS) + 1)
+
+    def test_changes(self):
+        changes, deleted, watermarks, has_more = self.Sync.get_changes(
+            self._watermarks(self.recent), fields_by_model={'patient.patient': ['patient_name']})
+        self.assertFalse(has_more)
+        self.assertEqual(changes['patient.patient'], [{'id': self.patient.id, 'patient_name': 'Sync'}])
+        self.assertEqual([row['id'] for row in changes['patient.appointment']], self.appointments.ids)
+        self.assertFalse(changes['patient.prescription'])
+        self.assertEqual(deleted, [])
+        # Rows written after the settled point are sent again next time.
+        self.assertEqual(watermarks, self._watermarks(self.settled))
+
+    def test_deleted(self):
+        appointment = self.appointments[0]
+        appointment.unlink()
+        changes, deleted, _watermarks, _has_more = self.Sync.get_changes(self._watermarks(self.recent))
+        self.assertIn({'model': 'patient.appointment', 'id': appointment.id}, deleted)
+        self.assertEqual([row['id'] for row in changes['patient.appointment']], self.appointments[1:].ids)
+
+    def test_has_more(self):
+        _changes, _deleted, watermarks, has_more = self.Sync.get_changes(self._watermarks(self.recent), limit=1)
+        self.assertTrue(has_more)
+        appointment_watermark = watermarks[SYNC_MODELS.index('patient.appointment')]
+        self.assertEqual(appointment_watermark[1], self.appointments[0].id)
+        changes, _deleted, watermarks, has_more = self.Sync.get_changes(watermarks, limit=1)
+        self.assertEqual([row['id'] for row in changes['patient.appointment']], self.appointments[1:].ids)
+
+    def test_quiet_model_watermark_moves(self):
+        """A client syncing regularly never falls out of the tombstone
+        retention, even when a model (or the tombstones) does not change."""
+        old = (self.now - timedelta(days=TOMBSTONE_RETENTION_DAYS - 1), 0)
+        _changes, _deleted, watermarks, _has_more = self.Sync.get_changes(self._watermarks(old))
+        self.assertEqual(watermarks[-1], self.settled)
+        self.assertEqual(watermarks[SYNC_MODELS.index('patient.prescription')], self.settled)
+        self.assertIsNotNone(self.Sync.get_changes(watermarks))
+
+    def test_expired(self):
+        expired = (self.now - timedelta(days=TOMBSTONE_RETENTION_DAYS + 1), 0)
+        watermarks = [self.recent] * len(SYNC_MODELS) + [expired]
+        self.assertIsNone(self.Sync.get_changes(watermarks))
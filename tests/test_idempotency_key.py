@@ -0,0 +1,46 @@
+from odoo.tests import TransactionCase
+
+from odoo.addons.dental_clinic.models.idempotency_key import response_cache
+
+
+class TestIdempotencyKey(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Keys = cls.env['api.idempotency.key'].sudo()
+        cls.user_id = cls.env.user.id
+
+    def _cache_key(self, key):
+        return (self.env.cr.dbname, self.user_id, key)
+
+    def test_claim_store_replay(self):
+        self.assertIsNone(self.Keys._claim(self.user_id, 'k1', '/api/patients', 'hash'))
+        # Claimed, no response yet: a concurrent retry is told to wait.
+        stored = self.Keys._claim(self.user_id, 'k1', '/api/patients', 'hash')
+        self.assertEqual(stored, {'request_hash': 'hash', 'status': None, 'content_type': None, 'body': None})
+
+        self.Keys._store(self.user_id, 'k1', 201, 'application/json', '{"id": 7}')
+        stored = self.Keys._claim(self.user_id, 'k1', '/api/patients', 'hash')
+        self.assertEqual(stored['status'], 201)
+        self.assertEqual(stored['body'], '{"id": 7}')
+
+    def test_cached_after_commit_only(self):
+        self.Keys._claim(self.user_id, 'k2', '/api/patients', 'hash')
+        self.Keys._store(self.user_id, 'k2', 201, 'application/json', '{"id": 8}')
+        # The transaction may still fail: nothing to replay from the cache yet.
+        self.assertIsNone(response_cache.get(self._cache_key('k2')))
+        self.env.cr.postcommit.run()
+        self.assertEqual(response_cache.get(self._cache_key('k2'))['body'], '{"id": 8}')
+
+    def test_release(self):
+        self.Keys._claim(self.user_id, 'k4', '/api/patients', 'hash')
+        self.Keys._release(self.user_id, 'k4')
+        self.assertIsNone(self.Keys._claim(self.user_id, 'k4', '/api/patients', 'other hash'))
+
+    def test_gc(self):
+        self.Keys._claim(self.user_id, 'k5', '/api/patients', 'hash')
+        self.env.cr.execute(
+            "UPDATE api_idempotency_key SET expiry_date = expiry_date - interval '2 days' WHERE key = 'k5'")
+        self.assertEqual(self.Keys._gc_idempotency_keys(), 1)
+        self.assertIsNone(self.Keys._claim(self.user_id, 'k5', '/api/patients', 'hash'))
@@ -0,0 +1,65 @@
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase
+
+from odoo.addons.dental_clinic.models.ir_sequence import (
+    CLINIC_SEQUENCE_CODES, SERIAL_BLOCK_SIZE_PARAM, SERIAL_MODE_PARAM, _serial_blocks,
+)
+
+
+class TestIrSequence(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.IrSequence = self.env['ir.sequence']
+        self.addCleanup(_serial_blocks.clear)
+
+    def _sequence(self, code, implementation):
+        return self.IrSequence.create({
+            'name': code, 'code': code, 'prefix': 'T', 'padding': 3, 'implementation': implementation,
+        })
+
+    def test_next_batch_no_gap(self):
+        sequence = self._sequence('test.serial.no_gap', 'no_gap')
+        self.assertEqual(self.IrSequence.next_batch_by_code('test.serial.no_gap', 3), ['T001', 'T002', 'T003'])
+        self.assertEqual(sequence.next_by_id(), 'T004')
+        self.assertEqual(self.IrSequence.next_batch_by_code('test.serial.no_gap', 0), [])
+
+    def test_next_batch_standard(self):
+        sequence = self._sequence('test.serial.standard', 'standard')
+        self.assertEqual(self.IrSequence.next_batch_by_code('test.serial.standard', 2), ['T001', 'T002'])
+        self.assertEqual(sequence.next_by_id(), 'T003')
+
+    def test_next_batch_unknown_code(self):
+        self.assertEqual(self.IrSequence.next_batch_by_code('test.serial.unknown', 2), [False, False])
+
+    def test_block_mode(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param(SERIAL_MODE_PARAM, 'block')
+        ICP.set_param(SERIAL_BLOCK_SIZE_PARAM, 10)
+        sequence = self._sequence('test.serial.block', 'standard')
+        self.assertEqual(self.IrSequence.next_clinic_serials('test.serial.block', 3), ['T001', 'T002', 'T003'])
+        self.assertEqual(self.IrSequence.next_clinic_serials('test.serial.block', 2), ['T004', 'T005'])
+        # The rest of the block is reserved by this worker.
+        self.assertEqual(sequence.next_by_id(), 'T011')
+        # More than a block at once.
+        serials = self.IrSequence.next_clinic_serials('test.serial.block', 12)
+        self.assertEqual(serials, ['T%03d' % number for number in list(range(6, 11)) + list(range(12, 19))])
+
+    def test_block_mode_no_gap_sequence(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param(SERIAL_MODE_PARAM, 'block')
+        ICP.set_param(SERIAL_BLOCK_SIZE_PARAM, 5)
+        sequence = self._sequence('test.serial.block_no_gap', 'no_gap')
+        self.assertEqual(self.IrSequence.next_clinic_serials('test.serial.block_no_gap', 2), ['T001', 'T002'])
+        sequence.invalidate_recordset(['number_next'])
+        self.assertEqual(sequence.number_next, 6)
+
+    def test_set_mode(self):
+        self.IrSequence.set_clinic_serial_mode('block')
+        sequences = self.IrSequence.sudo().search([('code', 'in', CLINIC_SEQUENCE_CODES)])
+        self.assertEqual(set(sequences.mapped('implementation')), {'standard'})
+        self.IrSequence.set_clinic_serial_mode('no_gap')
+        self.assertEqual(set(sequences.mapped('implementation')), {'no_gap'})
+        self.assertEqual(self.env['ir.config_parameter'].sudo().get_param(SERIAL_MODE_PARAM), 'no_gap')
+        with self.assertRaises(UserError):
+            self.IrSequence.set_clinic_serial_mode('random')
@@ -0,0 +1,89 @@
+from datetime import date, datetime
+
+from freezegun import freeze_time
+
+from odoo.tests import TransactionCase
+
+from odoo.addons.dental_clinic.models.patient import AGE_WATERMARK, age_label
+
+
+class TestPatientAge(TransactionCase):
+
+    def _create_patients(self, today):
+        with freeze_time(today):
+            patients = self.env['patient.patient'].create([
+                {'patient_name': name, 'date_of_birth': date_of_birth}
+                for name, date_of_birth in (
+                    ('Leap', '2000-02-29'),
+                    ('Feb 27', '2001-02-27'),
+                    ('Feb 28', '2001-02-28'),
+                    ('Mar 1', '2001-03-01'),
+                )
+            ])
+            # The stored age is computed on flush, which has to see the same day.
+            self.env.flush_all()
+        return patients
+
+    def _recompute_ages(self, today):
+        with freeze_time(today):
+            self.env['patient.patient']._cron_recompute_ages()
+        self.assertEqual(self.env['dental.clinic.watermark']._get_watermark(AGE_WATERMARK),
+                         datetime.fromisoformat(today))
+
+    def _set_last_run(self, day):
+        self.env['dental.clinic.watermark']._set_watermark(AGE_WATERMARK, day)
+
+    def test_age_label(self):
+        self.assertEqual(age_label(False, date(2027, 2, 28)), "")
+        self.assertEqual(age_label(date(2000, 2, 29), date(2027, 2, 27)), "26 Years Old")
+        self.assertEqual(age_label(date(2000, 2, 29), date(2027, 2, 28)), "27 Years Old")
+        self.assertEqual(age_label(date(2000, 2, 29), date(2028, 2, 28)), "27 Years Old")
+        self.assertEqual(age_label(date(2000, 2, 29), date(2028, 2, 29)), "28 Years Old")
+
+    def test_feb_29_common_year(self):
+        leap, feb27, feb28, mar1 = self._create_patients('2027-02-27')
+        self.assertEqual(leap.age, "26 Years Old")
+        self.assertEqual(feb28.age, "25 Years Old")
+        self._set_last_run('2027-02-27')
+        # Only the birthdays since the previous run are looked at.
+        self.env.cr.execute("UPDATE patient_patient SET age = 'stale' WHERE id = %s", [feb27.id])
+        self.env['patient.patient'].invalidate_model(['age'])
+
+        self._recompute_ages('2027-02-28')
+        self.assertEqual(leap.age, "27 Years Old")
+        self.assertEqual(feb28.age, "26 Years Old")
+        self.assertEqual(mar1.age, "25 Years Old")
+        self.assertEqual(feb27.age, "stale")
+
+        self._recompute_ages('2027-03-01')
+        self.assertEqual(leap.age, "27 Years Old")
+        self.assertEqual(mar1.age, "26 Years Old")
+
+    def test_feb_29_leap_year(self):
+        leap, _feb27, feb28, mar1 = self._create_patients('2028-02-28')
+        self.assertEqual(leap.age, "27 Years Old")
+        self.assertEqual(feb28.age, "27 Years Old")
+        self._set_last_run('2028-02-28')
+
+        self._recompute_ages('2028-02-29')
+        self.assertEqual(leap.age, "28 Years Old")
+        self.assertEqual(mar1.age, "26 Years Old")
+
+    def test_feb_29_missed_runs(self):
+        leap, feb27, feb28, mar1 = self._create_patients('2027-02-20')
+        self._set_last_run('2027-02-20')
+
+        self._recompute_ages('2027-03-05')
+        self.assertEqual(leap.age, "27 Years Old")
+        self.assertEqual(feb27.age, "26 Years Old")
+        self.assertEqual(feb28.age, "26 Years Old")
+        self.assertEqual(mar1.age, "26 Years Old")
+
+    def test_first_run(self):
+        leap, feb27, _feb28, _mar1 = self._create_patients('2027-02-20')
+        self.env.cr.execute("UPDATE patient_patient SET age = 'stale' WHERE id IN %s", [tuple(leap.ids + feb27.ids)])
+        self.env['patient.patient'].invalidate_model(['age'])
+
+        self._recompute_ages('2027-02-21')
+        self.assertEqual(leap.age, "26 Years Old")
+        self.assertEqual(feb27.age, "25 Years Old")
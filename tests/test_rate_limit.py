@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from odoo.tests import BaseCase, TransactionCase
+
+from odoo.addons.dental_clinic.models.rate_limit import RATE_LIMIT_PARAM, TokenBuckets, token_buckets
+
+
+class TestTokenBuckets(BaseCase):
+
+    def test_burst_then_refill(self):
+        buckets = TokenBuckets()
+        with patch('time.monotonic', return_value=100.0):
+            self.assertEqual([buckets.consume('k', 2, 0.5) for _i in range(2)], [0, 0])
+            self.assertEqual(buckets.consume('k', 2, 0.5), 2.0)
+            # Other keys have their own bucket.
+            self.assertEqual(buckets.consume('other', 2, 0.5), 0)
+        with patch('time.monotonic', return_value=101.0):
+            self.assertEqual(buckets.consume('k', 2, 0.5), 1.0)
+        with patch('time.monotonic', return_value=102.0):
+            self.assertEqual(buckets.consume('k', 2, 0.5), 0)
+
+    def test_lru(self):
+        buckets = TokenBuckets(size=1)
+        buckets.consume('a', 1, 0.1)
+        self.assertGreater(buckets.consume('a', 1, 0.1), 0)
+        buckets.consume('b', 1, 0.1)
+        # Evicted: full again.
+        self.assertEqual(buckets.consume('a', 1, 0.1), 0)
+
+
+class TestRateLimit(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.Buckets = self.env['api.rate.limit.bucket']
+        self.addCleanup(token_buckets.clear)
+
+    def _set_limit(self, endpoint_class, value):
+        self.env['ir.config_parameter'].sudo().set_param(RATE_LIMIT_PARAM % endpoint_class, value)
+
+    def test_default_limits(self):
+        self.assertEqual(self.Buckets._get_limit('read'), (120.0, 2.0))
+        self.assertEqual(self.Buckets._get_limit('sync'), (60.0, 1.0))
+        # Unknown classes get the read limit.
+        self.assertEqual(self.Buckets._get_limit('unknown'), (120.0, 2.0))
+
+    def test_configured_limits(self):
+        self._set_limit('write', '5,0.25')
+        self.assertEqual(self.Buckets._get_limit('write'), (5.0, 0.25))
+        # A bare number is the burst, with the default refill.
+        self._set_limit('write', '5')
+        self.assertEqual(self.Buckets._get_limit('write'), (5.0, 0.5))
+        self._set_limit('write', '0')
+        self.assertIsNone(self.Buckets._get_limit('write'))
+
+    def test_invalid_limits(self):
+        for value in ('fast', '5,0', '5,-1', '1,2,3'):
+            self._set_limit('export', value)
+            with self.assertLogs('odoo.addons.dental_clinic.models.rate_limit', 'WARNING'):
+                self.assertEqual(self.Buckets._get_limit('export'), (10.0, 0.1), value)
+
+    def test_consume(self):
+        self._set_limit('write', '2,0.001')
+        self.assertEqual(self.Buckets._consume('token', 'write'), 0)
+        self.assertEqual(self.Buckets._consume('token', 'write'), 0)
+        self.assertGreater(self.Buckets._consume('token', 'write'), 0)
+        # Per token and per class.
+        self.assertEqual(self.Buckets._consume('other token', 'write'), 0)
+        self.assertEqual(self.Buckets._consume('token', 'read'), 0)
+
+    def test_unlimited(self):
+        self._set_limit('write', '0')
+        for _i in range(5):
+            self.assertEqual(self.Buckets._consume('token', 'write'), 0)
+
+    def test_gc(self):
+        self.env.cr.execute("""
+            INSERT INTO api_rate_limit_bucket (key, tokens, updated_at)
+            VALUES ('old', 1, (now() AT TIME ZONE 'UTC') - interval '2 days'),
+                   ('recent', 1, now() AT TIME ZONE 'UTC')
+        """)
+        self.Buckets._gc_rate_limit_buckets()
+        self.assertEqual(self.Buckets.search([]).mapped('key'), ['recent'])